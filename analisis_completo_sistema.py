@@ -257,7 +257,7 @@ class AnalisisCompletoFinal:
             
             # Verificar funciones críticas
             funciones_criticas = [
-                ("def get_google_sheet_data():", "Función Google Sheets"),
+                ("def leer_libro_google():", "Función Google Sheets"),
                 ("@app.get(", "Endpoints API"),
                 ("app = FastAPI(", "Instancia FastAPI")
             ]
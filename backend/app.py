@@ -1,47 +1,37 @@
 # Sistema de Inventario SENA - Versión Corregida
-from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.staticfiles import StaticFiles  
-from fastapi.responses import FileResponse, JSONResponse
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
-from pydantic import BaseModel
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from sqlalchemy import Integer, Float
+from sqlalchemy import text, func, or_, select
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from dataclasses import dataclass
+from pydantic import BaseModel, Field
 from typing import Optional, List
 import os
-import re
-import gspread
-from google.oauth2.service_account import Credentials
+import io
+import csv
+import json
+import time
+import base64
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
-import pandas as pd
-
-# Configuración de base de datos
-DATABASE_URL = "sqlite:///./backend/inventario.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# Modelos de base de datos
-class Articulo(Base):
-    __tablename__ = "articulos"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    placa = Column(String, unique=True, index=True)
-    nombre = Column(String, index=True)
-    marca = Column(String)
-    modelo = Column(String)
-    categoria = Column(String, index=True)
-    descripcion = Column(Text)
-    valor = Column(String)
-    fecha_adquisicion = Column(String)
-    ubicacion = Column(String)
-    responsable = Column(String, index=True)
-    observaciones = Column(Text)
-    fecha_creacion = Column(DateTime, default=datetime.utcnow)
-    activo = Column(Boolean, default=True)
-
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+from database import (
+    SessionLocal, SesionEscritura, Articulo, Estadistica, Responsable, Auditoria, CAMPOS_ARTICULO, leer_version, asegurar_version, PESOS_FTS, BUSQUEDA_FTS, BUSQUEDA_SUBCADENAS, expresion_fts, expresion_subcadena,
+    publicar_estado_sync, solicitar_sync, leer_estado_sync, latido_sync
+)
+from sync_gs import leer_libro, sincronizar_articulos
+import gs_client
+import audit
+from serialize import RespuestaJSON, FilasCodificadas, respuesta_json
+from assets import CompresionMiddleware, RecursosEstaticos
+from scheduler import ProgramadorSync
 
 # Schemas Pydantic
 class ArticuloBase(BaseModel):
@@ -68,6 +58,23 @@ class ArticuloResponse(ArticuloBase):
     class Config:
         from_attributes = True
 
+class ResponsableCreate(BaseModel):
+    nombre: str
+    alias: List[str] = []
+
+LOOKUP_MAX_PLACAS = int(os.getenv("LOOKUP_MAX_PLACAS", "20000"))
+
+class LookupRequest(BaseModel):
+    placas: List[str] = Field(..., max_length=LOOKUP_MAX_PLACAS)
+
+class AuditoriaCreate(BaseModel):
+    nombre: str
+    ubicacion: Optional[str] = None  # sin ubicación se audita toda la sede
+
+class EscaneosRequest(BaseModel):
+    placas: List[str] = Field(..., max_length=LOOKUP_MAX_PLACAS)
+    ubicacion: Optional[str] = None  # dónde se escaneó (por defecto la de la auditoría)
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -76,165 +83,71 @@ def get_db():
     finally:
         db.close()
 
-# Función para obtener datos de Google Sheets
-def get_google_sheet_data():
-    """Obtener TODOS los datos reales de Google Sheets"""
+def get_db_escritura():
+    """Sesión para los endpoints que escriben: la conexión única de escritura
+    (BEGIN IMMEDIATE), así las escrituras no compiten con la sincronización"""
+    db = SesionEscritura()
     try:
-        print("🔍 Conectando con Google Sheets...")
-        
-        # Cargar variables de entorno
-        if os.path.exists('.env'):
-            load_dotenv()
-        
-        sheet_id = os.getenv('GOOGLE_SHEET_ID', '1tCILvM3VkaACJMNnTZu4ZYM3x81HcoTlg6uoj-K6RRQ')
-        credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'backend/credentials.json')
-        
-        # Verificar que existen las credenciales
-        if not os.path.exists(credentials_path):
-            print(f"❌ Credenciales no encontradas: {credentials_path}")
-            return generar_datos_ejemplo_minimo()
-        
-        # Configurar Google Sheets API
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets.readonly",
-            "https://www.googleapis.com/auth/drive.readonly"
-        ]
-        
-        creds = Credentials.from_service_account_file(credentials_path, scopes=scopes)
-        client = gspread.authorize(creds)
-        
-        # Abrir Google Sheet
-        sheet = client.open_by_key(sheet_id)
-        print(f"✅ Sheet abierto: {sheet.title}")
-        
-        # Procesar todas las hojas
-        articulos_totales = []
-        
-        for worksheet in sheet.worksheets():
-            try:
-                print(f"📊 Procesando hoja: {worksheet.title}")
-                
-                # Obtener todos los valores
-                all_values = worksheet.get_all_values()
-                
-                if len(all_values) <= 1:
-                    print(f"   ⚠️ Hoja {worksheet.title} vacía")
-                    continue
-                
-                headers = all_values[0]
-                data_rows = all_values[1:]
-                
-                print(f"   📈 Procesando {len(data_rows)} filas...")
-                
-                # Procesar cada fila
-                for i, row in enumerate(data_rows):
-                    try:
-                        # Asegurar que la fila tenga suficientes columnas
-                        while len(row) < len(headers):
-                            row.append("")
-                        
-                        # Crear diccionario para la fila
-                        row_dict = {headers[j]: row[j] if j < len(row) else "" for j in range(len(headers))}
-                        
-                        # Extraer placa
-                        placa = str(row_dict.get("Placa", "")).strip()
-                        
-                        # Solo incluir registros con placa válida
-                        if not placa or placa.lower() in ['', 'nan', 'none', 'null', 'placa']:
-                            continue
-                        
-                        # Extraer datos principales
-                        desc_actual = str(row_dict.get("Descripción Actual", "")).strip()
-                        marca = str(row_dict.get("Marca", "")).strip()
-                        modelo = str(row_dict.get("Modelo", "")).strip()
-                        
-                        # Construir nombre completo
-                        nombre_completo = desc_actual
-                        if marca and marca.upper() not in ['NA', 'N/A', '.', 'NAN']:
-                            nombre_completo += f" {marca}"
-                        if modelo and modelo.upper() not in ['NA', 'N/A', '.', 'NAN']:
-                            nombre_completo += f" {modelo}"
-                        
-                        # Valor monetario
-                        valor_bruto = str(row_dict.get("Valor Ingreso", "0"))
-                        valor_limpio = re.sub(r'[^0-9.,]', '', valor_bruto.replace(',', ''))
-                        try:
-                            valor_numerico = float(valor_limpio) if valor_limpio else 0
-                        except:
-                            valor_numerico = 0
-                        
-                        # Determinar responsable
-                        responsable = "Sin asignar"
-                        
-                        # Buscar en varios campos posibles
-                        campos_responsable = ["Centro/R", "Responsable", "Custodio", "Usuario"]
-                        for campo in campos_responsable:
-                            if campo in row_dict and row_dict[campo].strip():
-                                texto_resp = str(row_dict[campo]).strip()
-                                if texto_resp not in ['76,922710', '76.922710', '', 'NA']:
-                                    responsable = texto_resp
-                                    break
-                        
-                        # Si no encontró, buscar nombres conocidos
-                        if responsable == "Sin asignar":
-                            nombres_conocidos = [
-                                "ALVAREZ DIAZ JUAN GONZALO",
-                                "MANTILLA ARENAS WILLIAM", 
-                                "ALEXANDER ZAPATA TORO",
-                                "LOPEZ HERRERA OSCAR ANTONIO",
-                                "DOSSMAN MARQUEZ NOHORA LILIANA",
-                                "ARIAS FIGUEROA JAIME DIEGO"
-                            ]
-                            
-                            fila_texto = " ".join(str(v) for v in row_dict.values()).upper()
-                            for nombre in nombres_conocidos:
-                                if any(parte in fila_texto for parte in nombre.split()):
-                                    responsable = nombre
-                                    break
-                        
-                        # Crear artículo
-                        articulo = {
-                            "id": placa,
-                            "placa": placa,
-                            "nombre": nombre_completo.strip() or desc_actual or "Artículo",
-                            "marca": marca if marca.upper() not in ['NA', 'N/A', 'NAN'] else "",
-                            "modelo": modelo if modelo.upper() not in ['NA', 'N/A', 'NAN'] else "",
-                            "categoria": desc_actual or "Sin categoría",
-                            "descripcion": str(row_dict.get("Atributos", desc_actual)).strip() or desc_actual,
-                            "valor": str(valor_numerico),
-                            "fecha_adquisicion": str(row_dict.get("Fecha Adquisición", "")).strip(),
-                            "ubicacion": str(row_dict.get("Ubicación", "SENA")).strip(),
-                            "responsable": responsable,
-                            "observaciones": str(row_dict.get("Observaciones", "")).strip(),
-                            "consecutivo": str(row_dict.get("Consec.", "")).strip(),
-                            "tipo_elemento": str(row_dict.get("Tipo", "")).strip(),
-                            "hoja_origen": worksheet.title
-                        }
-                        
-                        articulos_totales.append(articulo)
-                        
-                    except Exception as e:
-                        print(f"   ⚠️ Error fila {i+1}: {e}")
-                        continue
-                
-                count_hoja = len([a for a in articulos_totales if a.get('hoja_origen') == worksheet.title])
-                print(f"   ✅ {count_hoja} artículos procesados de {worksheet.title}")
-                
-            except Exception as e:
-                print(f"   ❌ Error procesando hoja {worksheet.title}: {e}")
-                continue
-        
-        print(f"🎉 TOTAL PROCESADO: {len(articulos_totales)} artículos")
-        
-        if not articulos_totales:
-            print("⚠️ No se encontraron artículos, usando datos mínimos")
-            return generar_datos_ejemplo_minimo()
-        
-        return articulos_totales
-        
-    except Exception as e:
-        print(f"❌ Error general Google Sheets: {e}")
-        return generar_datos_ejemplo_minimo()
+        yield db
+    finally:
+        db.close()
+
+def respuesta_error(mensaje, status_code=500, **datos):
+    """Error con su código HTTP: solo las respuestas 200 llevan el ETag de la versión de los datos"""
+    return JSONResponse(status_code=status_code, content={"error": mensaje, **datos})
+
+# Serialización de artículos
+def articulo_a_dict(articulo: Articulo):
+    """Representación JSON de un artículo (misma forma que la de Sheets)"""
+    datos = {"id": articulo.placa}
+    datos.update({campo: getattr(articulo, campo) or "" for campo in CAMPOS_ARTICULO})
+    return datos
+
+# JSON ya codificado por artículo (se reutiliza mientras la fila no cambie)
+filas_json = FilasCodificadas(articulo_a_dict)
+
+# Límites para las lecturas de Google Sheets
+SHEETS_TIMEOUT_SEGUNDOS = float(os.getenv("SHEETS_TIMEOUT", "60"))
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "2"))
+
+# Rol del proceso (ver serve.py): "completo" lee Sheets y sirve la API en un
+# solo proceso; con varios, el "sincronizador" es el único que lee Sheets y
+# escribe SQLite y los "lector" solo sirven lo que hay en SQLite
+ROL_PROCESO = os.getenv("INVENTARIO_ROL", "completo")
+LECTOR = ROL_PROCESO == "lector"
+
+# Función para obtener datos de Google Sheets
+def configuracion_google():
+    """ID del libro y ruta de las credenciales (variables de entorno / .env)"""
+    if os.path.exists('.env'):
+        load_dotenv()
+    sheet_id = os.getenv('GOOGLE_SHEET_ID', '1tCILvM3VkaACJMNnTZu4ZYM3x81HcoTlg6uoj-K6RRQ')
+    credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'backend/credentials.json')
+    return sheet_id, credentials_path
+
+def leer_libro_google():
+    """Leer TODAS las hojas de Google Sheets (propaga los errores).
+    
+    Devuelve los artículos y las hojas leídas completas.
+    """
+    print("🔍 Conectando con Google Sheets...")
+    
+    sheet_id, credentials_path = configuracion_google()
+    client = gs_client.obtener_cliente(credentials_path, timeout=SHEETS_TIMEOUT_SEGUNDOS)
+    
+    # Abrir Google Sheet
+    sheet = client.open_by_key(sheet_id)
+    print(f"✅ Sheet abierto: {sheet.title}")
+    
+    # Procesar todas las hojas
+    articulos_totales, hojas_leidas = leer_libro(sheet)
+    
+    print(f"🎉 TOTAL PROCESADO: {len(articulos_totales)} artículos")
+    
+    if not articulos_totales:
+        raise ValueError("No se encontraron artículos en Google Sheets")
+    
+    return articulos_totales, hojas_leidas
 
 def generar_datos_ejemplo_minimo():
     """Datos mínimos si Google Sheets falla"""
@@ -258,35 +171,531 @@ def generar_datos_ejemplo_minimo():
         }
     ]
 
+# Caché en memoria del inventario
+CACHE_TTL_SEGUNDOS = float(os.getenv("INVENTARIO_CACHE_TTL", "300"))
+CACHE_REINTENTO_SEGUNDOS = float(os.getenv("INVENTARIO_CACHE_REINTENTO", "30"))
+
+@dataclass(frozen=True)
+class InventarioSnapshot:
+    """Resultado de la última lectura de Google Sheets.
+    
+    Los artículos se sirven desde SQLite: aquí solo queda cuántos se leyeron.
+    `version` es la de los datos en SQLite (estado_datos) tras aplicar la
+    lectura; "" para los datos de ejemplo.
+    """
+    version: str
+    total_articulos: int
+    cargado_en: float
+    fecha: datetime
+    
+    @classmethod
+    def crear(cls, articulos, version=""):
+        return cls(version, len(articulos), time.monotonic(), datetime.utcnow())
+
+class SnapshotCache:
+    """Caché con TTL y refresco único (single-flight) del inventario.
+    
+    Las peticiones concurrentes que encuentran el snapshot vencido esperan
+    una sola lectura de Google Sheets en lugar de lanzar una cada una. Si la
+    lectura falla se conserva el último snapshot válido. `cargador()` devuelve
+    (artículos, versión de los datos).
+    """
+    
+    def __init__(self, cargador, ttl=CACHE_TTL_SEGUNDOS, reintento=CACHE_REINTENTO_SEGUNDOS):
+        self._cargador = cargador
+        self.ttl = ttl
+        self.reintento = reintento
+        self._snapshot: Optional[InventarioSnapshot] = None
+        self._expira_en = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def snapshot(self) -> Optional[InventarioSnapshot]:
+        return self._snapshot
+    
+    def vigente(self):
+        return self._snapshot is not None and time.monotonic() < self._expira_en
+    
+    def obtener(self) -> InventarioSnapshot:
+        """Snapshot vigente, refrescándolo si venció el TTL"""
+        if self.vigente():
+            return self._snapshot
+        with self._lock:
+            # Otra petición pudo refrescarlo mientras esperábamos el lock
+            if self.vigente():
+                return self._snapshot
+            if time.monotonic() < self._expira_en:
+                # Último intento fallido y sin datos previos: no reintentar aún
+                return InventarioSnapshot.crear(generar_datos_ejemplo_minimo())
+            try:
+                return self._cargar()
+            except Exception as e:
+                print(f"❌ Error refrescando inventario: {e}")
+                self._expira_en = time.monotonic() + self.reintento
+                return self._snapshot or InventarioSnapshot.crear(generar_datos_ejemplo_minimo())
+    
+    def refrescar(self) -> InventarioSnapshot:
+        """Forzar una nueva lectura de Google Sheets (invalidación explícita)"""
+        anterior = self._snapshot
+        with self._lock:
+            # Si otra petición ya refrescó mientras esperábamos, reutilizarlo
+            if self._snapshot is not anterior:
+                return self._snapshot
+            return self._cargar()
+    
+    def confirmar(self):
+        """Dar el snapshot por vigente otro TTL (la fuente confirmó que no cambió)"""
+        if self._snapshot is not None:
+            self._expira_en = time.monotonic() + self.ttl
+    
+    def _cargar(self):
+        snapshot = InventarioSnapshot.crear(*self._cargador())
+        self._snapshot = snapshot
+        self._expira_en = snapshot.cargado_en + self.ttl
+        print(f"📦 Snapshot {snapshot.version}: {snapshot.total_articulos} artículos")
+        return snapshot
+
+ultima_sincronizacion = {}
+
+def sincronizar_desde_sheets():
+    """Leer Google Sheets y aplicar a SQLite solo los cambios; (artículos, versión de los datos)"""
+    global ultima_sincronizacion
+    inicio = time.monotonic()
+    articulos, hojas = leer_libro_google()
+    modificadas = set()
+    db = SesionEscritura()
+    try:
+        resumen = sincronizar_articulos(db, articulos, hojas=hojas, modificadas=modificadas)
+        print(f"💾 Cambios aplicados en SQLite: {resumen}")
+    finally:
+        db.close()
+    ultima_sincronizacion = resumen
+    programador_sync.registrar(time.monotonic() - inicio, resumen)
+    version, _ = estado_datos(forzar=True)
+    detalle_cache.invalidar(modificadas, version)
+    return articulos, version
+
+inventario_cache = SnapshotCache(sincronizar_desde_sheets)
+
+# Las lecturas de Sheets (red + parseo) corren fuera del event loop, en un
+# pool acotado, para que /health y el resto de endpoints sigan respondiendo
+sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+_refresco_en_curso: Optional[Future] = None
+_refresco_lock = threading.Lock()
+
+async def ejecutar_en_sheets_executor(funcion, *args):
+    """Ejecutar una función bloqueante en el pool de Sheets con timeout"""
+    loop = asyncio.get_running_loop()
+    futuro = loop.run_in_executor(sheets_executor, funcion, *args)
+    return await asyncio.wait_for(futuro, timeout=SHEETS_TIMEOUT_SEGUNDOS)
+
+def programar_refresco():
+    """Lanzar un refresco en segundo plano si no hay uno en curso (desde el loop o un hilo)"""
+    global _refresco_en_curso
+    if LECTOR:
+        return
+    with _refresco_lock:
+        if _refresco_en_curso is None or _refresco_en_curso.done():
+            _refresco_en_curso = sheets_executor.submit(inventario_cache.obtener)
+
+# Sincronización en segundo plano: consulta la revisión del libro en Drive y
+# solo relee Sheets cuando cambió (SYNC_INTERVALO=0 la desactiva)
+SYNC_INTERVALO_SEGUNDOS = float(os.getenv("SYNC_INTERVALO", "60"))
+SYNC_VARIACION = float(os.getenv("SYNC_VARIACION", "0.2"))
+SYNC_ESPERA_MAXIMA_SEGUNDOS = float(os.getenv("SYNC_ESPERA_MAXIMA", "900"))
+
+SYNC_SOLICITUDES_SEGUNDOS = float(os.getenv("SYNC_SOLICITUDES", "2"))
+# Sin latido del sincronizador en este tiempo los workers lo dan por caído
+# (holgado: el latido puede esperar a que termine la escritura de una sincronización)
+SYNC_LATIDO_MAXIMO_SEGUNDOS = float(os.getenv("SYNC_LATIDO_MAXIMO", max(60.0, 10 * SYNC_SOLICITUDES_SEGUNDOS)))
+
+def revision_libro_google():
+    sheet_id, credentials_path = configuracion_google()
+    client = gs_client.obtener_cliente(credentials_path, timeout=SHEETS_TIMEOUT_SEGUNDOS)
+    return gs_client.revision_archivo(client, sheet_id)
+
+programador_sync = ProgramadorSync(
+    revision_libro_google,
+    inventario_cache.refrescar,
+    ejecutar_en_sheets_executor,
+    # Sin cambios en el libro el snapshot sigue vigente: las peticiones no releen Sheets
+    sin_cambios=inventario_cache.confirmar,
+    # El sincronizador deja su estado en SQLite para /api/sync/estado de los workers
+    publicar=(
+        (lambda estado: con_sesion(publicar_estado_sync, estado, sesion=SesionEscritura))
+        if ROL_PROCESO == "sincronizador" else None
+    ),
+    intervalo=SYNC_INTERVALO_SEGUNDOS,
+    variacion=SYNC_VARIACION,
+    espera_maxima=SYNC_ESPERA_MAXIMA_SEGUNDOS,
+)
+
+def con_sesion(funcion, *args, sesion=SessionLocal):
+    """Llamar funcion(db, *args) con una sesión propia (fuera de las peticiones)"""
+    db = sesion()
+    try:
+        return funcion(db, *args)
+    finally:
+        db.close()
+
+async def ejecutar_sincronizador():
+    """Proceso sincronizador de serve.py: sincroniza y atiende las solicitudes de los workers"""
+    if not os.path.exists(configuracion_google()[1]) or SYNC_INTERVALO_SEGUNDOS <= 0:
+        print("⚠️ Sin credenciales de Google o con SYNC_INTERVALO=0: no hay nada que sincronizar")
+        await programador_sync.publicar()
+        return
+    precargar_google()
+    programador_sync.iniciar()
+    atendida = con_sesion(latido_sync, sesion=SesionEscritura)
+    try:
+        while programador_sync.activo:
+            await asyncio.sleep(SYNC_SOLICITUDES_SEGUNDOS)
+            # Latido y lectura de solicitudes en una transacción, fuera del loop
+            # (y del pool de Sheets, que puede estar ocupado sincronizando)
+            try:
+                solicitada = await run_in_threadpool(con_sesion, latido_sync, sesion=SesionEscritura)
+            except Exception as e:
+                print(f"⚠️ Latido del sincronizador no registrado: {e}")
+                continue
+            if solicitada is not None and solicitada != atendida:
+                atendida = solicitada
+                programador_sync.solicitar()
+    finally:
+        await programador_sync.detener()
+        await programador_sync.publicar()  # que los workers lo vean detenido
+        sheets_executor.shutdown(wait=False, cancel_futures=True)
+        con_sesion(latido_sync, False, sesion=SesionEscritura)  # sync_pull responde 503
+
+def hay_articulos(db: Session):
+    return db.query(Articulo.id).first() is not None
+
+def asegurar_datos():
+    """Garantizar que SQLite tiene datos que servir.
+    
+    Se llama desde los endpoints, que corren en el threadpool (no en el
+    event loop). Con datos ya guardados nunca se espera a Sheets: si la caché
+    venció se refresca en segundo plano. Solo una base vacía espera la
+    primera carga. Los workers "lector" nunca leen Sheets: sirven lo que
+    escribió el sincronizador. Usa su propia sesión, cerrada al volver.
+    """
+    if LECTOR:
+        return
+    if inventario_cache.vigente():
+        return
+    if inventario_cache.snapshot is not None or con_sesion(hay_articulos):
+        programar_refresco()
+        return
+    try:
+        sheets_executor.submit(inventario_cache.obtener).result(timeout=SHEETS_TIMEOUT_SEGUNDOS)
+    except TimeoutError:
+        print(f"⏱️ Google Sheets no respondió en {SHEETS_TIMEOUT_SEGUNDOS}s")
+
+def articulos_activos(db: Session):
+    return db.query(Articulo).filter(Articulo.activo == True)
+
+def patron_contiene(valor: str):
+    """Patrón LIKE de subcadena con los comodines del usuario escapados"""
+    escapado = valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+def filtros_consulta(busqueda=None, categoria=None, responsable=None,
+                     valor_min=None, valor_max=None, desde=None, hasta=None):
+    """Condiciones SQL equivalentes a los filtros de consulta_inventario.
+    
+    `busqueda` encuentra el texto como subcadena de placa o nombre (índice
+    de trigramas; sin él, LIKE también en la descripción) y, con FTS5,
+    artículos con todas sus palabras por prefijo en cualquier campo. Los
+    rangos de valor (en pesos) y de fecha de adquisición usan las columnas
+    tipadas e indexadas valor_centavos y dia_adquisicion.
+    """
+    condiciones = [Articulo.activo == True]
+    if busqueda:
+        opciones = []
+        expresion = expresion_fts(busqueda) if BUSQUEDA_FTS else None
+        if expresion:
+            coincidencias = text("SELECT rowid FROM articulos_fts WHERE articulos_fts MATCH :expresion")
+            opciones.append(Articulo.id.in_(coincidencias.bindparams(expresion=expresion)))
+        subcadena = expresion_subcadena(busqueda) if BUSQUEDA_SUBCADENAS else None
+        if subcadena:
+            coincidencias = text("SELECT rowid FROM articulos_trigramas WHERE articulos_trigramas MATCH :subcadena")
+            opciones.append(Articulo.id.in_(coincidencias.bindparams(subcadena=subcadena)))
+        else:
+            patron = patron_contiene(busqueda)
+            opciones.extend([
+                Articulo.nombre.ilike(patron, escape="\\"),
+                Articulo.placa.ilike(patron, escape="\\"),
+                Articulo.descripcion.ilike(patron, escape="\\"),
+            ])
+        condiciones.append(or_(*opciones))
+    if categoria:
+        condiciones.append(Articulo.categoria.ilike(patron_contiene(categoria), escape="\\"))
+    if responsable:
+        condiciones.append(Articulo.responsable.ilike(patron_contiene(responsable), escape="\\"))
+    if valor_min is not None:
+        condiciones.append(Articulo.valor_centavos >= round(valor_min * 100))
+    if valor_max is not None:
+        condiciones.append(Articulo.valor_centavos <= round(valor_max * 100))
+    if desde is not None:
+        condiciones.append(Articulo.dia_adquisicion >= desde)
+    if hasta is not None:
+        condiciones.append(Articulo.dia_adquisicion <= hasta)
+    return condiciones
+
+# Versión de los datos servidos (database.EstadoDatos). Se relee de SQLite como
+# mucho cada ESTADO_REVALIDAR segundos para ver cambios de otros procesos
+ESTADO_REVALIDAR_SEGUNDOS = float(os.getenv("ESTADO_REVALIDAR", "2"))
+_estado_datos = (None, None, 0.0)
+
+def estado_datos(forzar=False, db: Optional[Session] = None):
+    """(versión, fecha de modificación) de los datos en SQLite.
+    
+    Dentro de una petición se pasa su sesión: abrir otra mientras la de la
+    petición retiene su conexión puede agotar el pool con muchas peticiones.
+    """
+    global _estado_datos
+    version, modificado, leido_en = _estado_datos
+    if forzar or time.monotonic() - leido_en > ESTADO_REVALIDAR_SEGUNDOS:
+        version, modificado = leer_version(db) if db is not None else con_sesion(leer_version)
+        if version is None:
+            # Base sin versión registrada: calcularla y guardarla con la sesión de escritura
+            version, modificado = con_sesion(asegurar_version, sesion=SesionEscritura)
+        _estado_datos = (version, modificado, time.monotonic())
+    return version, modificado
+
+def estado_datos_en_memoria():
+    """(versión, fecha) si no hace falta releerla de SQLite; None si venció"""
+    version, modificado, leido_en = _estado_datos
+    if time.monotonic() - leido_en > ESTADO_REVALIDAR_SEGUNDOS:
+        return None
+    return version, modificado
+
+# Paginación por cursor (keyset): el token lleva el último id entregado, la
+# versión del snapshot y una huella de los filtros, codificados en base64
+CONTEOS_EN_CACHE = 256
+_conteos = {}
+_conteos_lock = threading.Lock()
+
+def version_actual(db: Optional[Session] = None):
+    return estado_datos(db=db)[0] or ""
+
+def huella_filtros(**filtros):
+    contenido = json.dumps(sorted((k, v) for k, v in filtros.items() if v is not None and v != ""), ensure_ascii=False, default=str)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()[:12]
+
+def codificar_cursor(ultimo_id, version, filtros):
+    contenido = json.dumps({"id": ultimo_id, "v": version, "f": filtros}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodificar_cursor(token, filtros):
+    """(último id, versión) del token; "" inicia el recorrido"""
+    if not token:
+        return 0, None
+    try:
+        relleno = "=" * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(token + relleno))
+        ultimo_id, version, huella = int(cursor["id"]), cursor["v"], cursor["f"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if huella != filtros:
+        raise ValueError("El cursor corresponde a otros filtros; reinicie el recorrido")
+    return ultimo_id, version
+
+def contar_filtrados(db: Session, condiciones, version, filtros):
+    """Total de la consulta, memorizado por versión del snapshot y filtros"""
+    clave = (version, filtros)
+    with _conteos_lock:
+        total = _conteos.get(clave)
+    if total is None:
+        # El COUNT corre sin el lock; dos peticiones iguales a la vez cuentan las dos
+        total = db.execute(select(func.count()).select_from(Articulo).where(*condiciones)).scalar()
+        with _conteos_lock:
+            if len(_conteos) >= CONTEOS_EN_CACHE:
+                _conteos.clear()
+            _conteos[clave] = total
+    return total
+
+# Exportación en streaming: filas leídas por lotes de EXPORT_FILAS_POR_LOTE
+EXPORT_FILAS_POR_LOTE = int(os.getenv("EXPORT_FILAS_POR_LOTE", "1000"))
+COLUMNAS_EXPORTACION = ["id", *CAMPOS_ARTICULO]
+
+def lotes_exportacion(condiciones):
+    """Lotes de filas en orden de id, paginados por cursor (id > último).
+    
+    Cada lote usa una sesión que se cierra antes de entregarlo: mientras el
+    cliente descarga no se retiene ninguna conexión del pool. Una
+    sincronización a mitad de la exportación se ve en los lotes siguientes,
+    pero ninguna fila se repite.
+    """
+    columnas = (*(getattr(Articulo, campo) for campo in CAMPOS_ARTICULO), Articulo.huella, Articulo.id)
+    ultimo_id = 0
+    while True:
+        with SessionLocal() as db:
+            lote = db.execute(
+                select(*columnas)
+                .where(*condiciones, Articulo.id > ultimo_id)
+                .order_by(Articulo.id)
+                .limit(EXPORT_FILAS_POR_LOTE)
+            ).all()
+        if not lote:
+            return
+        yield lote
+        if len(lote) < EXPORT_FILAS_POR_LOTE:
+            return
+        ultimo_id = lote[-1].id
+
+def filas_exportacion(condiciones, formato):
+    """Generador de la exportación (NDJSON o CSV), un bloque de texto por lote.
+    
+    Se consume después de que el endpoint devuelve la respuesta; la memoria
+    no depende del número de filas.
+    """
+    lotes = lotes_exportacion(condiciones)
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(COLUMNAS_EXPORTACION)
+        for lote in lotes:
+            escritor.writerows(articulo_a_dict(fila).values() for fila in lote)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        for lote in lotes:
+            yield b"".join(filas_json.codificar(fila) + b"\n" for fila in lote)
+
+# Caché de detalle por placa (artículos consultados recientemente)
+DETALLE_CACHE_MAX = int(os.getenv("DETALLE_CACHE_MAX", "2048"))
+
+class CacheDetalle:
+    """LRU acotada con el JSON ya codificado de los artículos consultados por placa.
+    
+    Cada sincronización de este proceso invalida solo las placas que cambió;
+    si la versión de los datos cambia por otra vía (otro proceso) se vacía.
+    """
+    
+    def __init__(self, maximo=DETALLE_CACHE_MAX):
+        self.maximo = maximo
+        self._filas = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def obtener(self, placa, version):
+        with self._lock:
+            if version != self._version:
+                self._filas.clear()
+                self._version = version
+                return None
+            datos = self._filas.get(placa)
+            if datos is not None:
+                self._filas.move_to_end(placa)
+            return datos
+    
+    def guardar(self, placa, datos, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._filas[placa] = datos
+            self._filas.move_to_end(placa)
+            if len(self._filas) > self.maximo:
+                self._filas.popitem(last=False)
+    
+    def invalidar(self, placas, version):
+        """Quitar las placas modificadas y adoptar la nueva versión de los datos"""
+        with self._lock:
+            for placa in placas:
+                self._filas.pop(placa, None)
+            self._version = version
+
+detalle_cache = CacheDetalle()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="Sistema de Inventario SENA",
     description="Sistema de gestión de inventario conectado con Google Sheets",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=RespuestaJSON
 )
 
-# Servir archivos estáticos
-try:
-    app.mount("/static", StaticFiles(directory="frontend"), name="static")
-except:
+# Compresión (brotli/gzip) de las respuestas de al menos COMPRESION_MINIMA bytes
+COMPRESION_MINIMA = int(os.getenv("COMPRESION_MINIMA", "1024"))
+app.add_middleware(CompresionMiddleware, minimo=COMPRESION_MINIMA)
+
+# Peticiones condicionales: las lecturas del inventario llevan ETag y
+# Last-Modified de la versión de los datos; si el cliente ya la tiene se
+# responde 304 sin ejecutar el endpoint
+RUTAS_VERSIONADAS = ("/api/articulos", "/api/inventario/")
+
+def cabeceras_version(version, modificado):
+    cabeceras = {"ETag": f'W/"{version}"', "Cache-Control": "no-cache"}
+    if modificado:
+        cabeceras["Last-Modified"] = format_datetime(modificado.replace(tzinfo=timezone.utc), usegmt=True)
+    return cabeceras
+
+def no_modificado(request, version, modificado):
+    """¿La copia del cliente (If-None-Match / If-Modified-Since) sigue vigente?"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etiquetas = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+        return "*" in etiquetas or f'"{version}"' in etiquetas
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modificado:
+        try:
+            return modificado.replace(tzinfo=timezone.utc) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@app.middleware("http")
+async def peticiones_condicionales(request, call_next):
+    if request.method not in ("GET", "HEAD") or not request.url.path.startswith(RUTAS_VERSIONADAS):
+        return await call_next(request)
+    # Releer la versión consulta SQLite: se hace en el threadpool, no en el event loop
+    version, modificado = estado_datos_en_memoria() or await run_in_threadpool(estado_datos)
+    if version is None:
+        return await call_next(request)
+    cabeceras = cabeceras_version(version, modificado)
+    if no_modificado(request, version, modificado):
+        # Igual que asegurar_datos: si la caché venció, refrescar en segundo plano
+        if not inventario_cache.vigente():
+            programar_refresco()
+        return Response(status_code=304, headers=cabeceras)
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(cabeceras)
+    return response
+
+# Servir archivos estáticos (precomprimidos y con URL versionada). Se cargan
+# aquí, al arrancar; los endpoints son `def` porque pueden recargar de disco
+estaticos = RecursosEstaticos()
+if not estaticos.directorio.is_dir():
     print("⚠️ Directorio frontend no encontrado")
 
+@app.get("/static/{ruta:path}")
+def archivo_estatico(ruta: str, request: Request):
+    """Archivos de frontend/; los de URL versionada se guardan en caché un año"""
+    respuesta = estaticos.respuesta(request, ruta)
+    if respuesta is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    return respuesta
+
 # Rutas principales
 @app.get("/")
-async def root():
+def root(request: Request):
     """Página principal"""
-    try:
-        return FileResponse("frontend/admin.html")
-    except:
+    respuesta = estaticos.respuesta(request, "admin.html")
+    if respuesta is None:
         return {"message": "Sistema de Inventario SENA", "status": "funcionando"}
+    return respuesta
 
 @app.get("/admin.html")  
-async def admin():
+def admin(request: Request):
     """Panel administrativo"""
-    try:
-        return FileResponse("frontend/admin.html")
-    except:
+    respuesta = estaticos.respuesta(request, "admin.html")
+    if respuesta is None:
         return {"message": "Panel administrativo disponible"}
+    return respuesta
 
 @app.get("/health")
 async def health():
@@ -295,149 +704,454 @@ async def health():
 
 # API Endpoints
 @app.get("/api/articulos")
-async def get_articulos():
+def get_articulos(db: Session = Depends(get_db)):
     """Obtener todos los artículos"""
     try:
-        articulos = get_google_sheet_data()
-        return articulos
+        asegurar_datos()
+        return Response(filas_json.lista(articulos_activos(db).order_by(Articulo.id)), media_type="application/json")
     except Exception as e:
-        return {"error": str(e), "articulos": []}
+        return respuesta_error(str(e), articulos=[])
 
 @app.get("/api/inventario/consulta")
-async def consulta_inventario(
+def consulta_inventario(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
     busqueda: Optional[str] = Query(None),
     categoria: Optional[str] = Query(None),
-    responsable: Optional[str] = Query(None)
+    responsable: Optional[str] = Query(None),
+    valor_min: Optional[float] = Query(None, ge=0, description="Valor mínimo en pesos"),
+    valor_max: Optional[float] = Query(None, ge=0, description="Valor máximo en pesos"),
+    desde: Optional[date] = Query(None, description="Adquiridos desde (AAAA-MM-DD)"),
+    hasta: Optional[date] = Query(None, description="Adquiridos hasta (AAAA-MM-DD)"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (vacío para empezar)"),
+    db: Session = Depends(get_db)
 ):
-    """Consulta paginada del inventario"""
+    """Consulta paginada del inventario.
+    
+    Con `after` se pagina por cursor: cada página cuesta lo mismo sin
+    importar la profundidad y una sincronización a mitad del recorrido no
+    desplaza los resultados. `page` solo se devuelve tal cual para mostrarla.
+    """
     try:
-        # Obtener todos los artículos
-        todos_articulos = get_google_sheet_data()
+        asegurar_datos()
+        filtros = dict(busqueda=busqueda, categoria=categoria, responsable=responsable,
+                       valor_min=valor_min, valor_max=valor_max, desde=desde, hasta=hasta)
+        condiciones = filtros_consulta(**filtros)
         
-        # Aplicar filtros
-        articulos_filtrados = todos_articulos
+        if after is not None:
+            return consulta_por_cursor(db, condiciones, after, page, limit, **filtros)
         
-        if busqueda:
-            busqueda = busqueda.lower()
-            articulos_filtrados = [
-                art for art in articulos_filtrados 
-                if busqueda in art.get('nombre', '').lower() or 
-                   busqueda in art.get('placa', '').lower() or
-                   busqueda in art.get('descripcion', '').lower()
-            ]
+        # La página se limita con LIMIT y el total es un COUNT aparte,
+        # memorizado por versión de los datos y filtros (una función de
+        # ventana obligaría a SQLite a recorrer todo el filtro por página)
+        stmt = (
+            select(*Articulo.__table__.columns)
+            .where(*condiciones)
+            .order_by(Articulo.id)
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
+        articulos_pagina = db.execute(stmt).all()
+        total = contar_filtrados(db, condiciones, version_actual(db), huella_filtros(**filtros))
+        total_pages = (total + limit - 1) // limit
         
-        if categoria:
-            articulos_filtrados = [
-                art for art in articulos_filtrados 
-                if categoria.lower() in art.get('categoria', '').lower()
-            ]
+        return respuesta_json(
+            articulos=filas_json.lista(articulos_pagina),
+            total=total,
+            page=page,
+            limit=limit,
+            total_pages=total_pages,
+            has_next=page < total_pages,
+            has_prev=page > 1
+        )
         
-        if responsable:
-            articulos_filtrados = [
-                art for art in articulos_filtrados 
-                if responsable.lower() in art.get('responsable', '').lower()
-            ]
+    except ValueError as e:
+        # Cursor inválido o de otros filtros
+        return respuesta_error(str(e), articulos=[], total=0, status_code=400)
+    except Exception as e:
+        return respuesta_error(str(e), articulos=[], total=0)
+
+def consulta_por_cursor(db: Session, condiciones, after, page, limit, **filtros):
+    """Página siguiente al cursor `after`, ordenada por id (índice de la clave primaria)"""
+    huella = huella_filtros(**filtros)
+    ultimo_id, version_cursor = decodificar_cursor(after, huella)
+    version = version_actual(db)
+    
+    # Una fila de más para saber si hay otra página sin contar
+    filas = db.execute(
+        select(Articulo).where(*condiciones, Articulo.id > ultimo_id).order_by(Articulo.id).limit(limit + 1)
+    ).scalars().all()
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    total = contar_filtrados(db, condiciones, version, huella)
+    
+    return respuesta_json(
+        articulos=filas_json.lista(filas),
+        total=total,
+        page=page,
+        limit=limit,
+        total_pages=(total + limit - 1) // limit,
+        has_next=hay_mas,
+        has_prev=ultimo_id > 0,
+        next=codificar_cursor(filas[-1].id, version_cursor or version, huella) if hay_mas else None,
+        version=version,
+        # El inventario cambió desde el inicio del recorrido; las filas ya
+        # entregadas no se repiten, pero pueden haberse modificado
+        version_cambiada=version_cursor is not None and version_cursor != version
+    )
+
+@app.get("/api/inventario/export")
+def exportar_inventario(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    busqueda: Optional[str] = Query(None),
+    categoria: Optional[str] = Query(None),
+    responsable: Optional[str] = Query(None),
+    valor_min: Optional[float] = Query(None, ge=0),
+    valor_max: Optional[float] = Query(None, ge=0),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+):
+    """Exportar el inventario activo (mismos filtros que la consulta) en NDJSON o CSV.
+    
+    Sin sesión de petición: los lotes abren y cierran la suya (ver lotes_exportacion).
+    """
+    try:
+        asegurar_datos()
+        condiciones = filtros_consulta(busqueda, categoria, responsable, valor_min, valor_max, desde, hasta)
+    except Exception as e:
+        return respuesta_error(str(e))
+    
+    nombre = f"inventario_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    tipo = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        filas_exportacion(condiciones, formato),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+@app.get("/api/inventario/buscar")
+def buscar_inventario(
+    q: str = Query(..., description="Texto a buscar"),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Búsqueda por texto libre, ordenada por relevancia"""
+    try:
+        asegurar_datos()
+        if not q.strip():
+            return {"query": q, "resultados": [], "total_encontrados": 0}
         
-        # Paginación
-        total = len(articulos_filtrados)
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        articulos_pagina = articulos_filtrados[start_idx:end_idx]
+        expresion = expresion_fts(q) if BUSQUEDA_FTS else None
+        if expresion:
+            # Primero por relevancia (bm25) y después las que solo coinciden como subcadena
+            pesos = ", ".join(str(p) for p in PESOS_FTS)
+            ranking = text(
+                f"SELECT rowid AS id, bm25(articulos_fts, {pesos}) AS puntaje FROM articulos_fts "
+                f"WHERE articulos_fts MATCH :expresion"
+            ).bindparams(expresion=expresion).columns(id=Integer, puntaje=Float).subquery()
+            stmt = (
+                select(Articulo)
+                .outerjoin(ranking, ranking.c.id == Articulo.id)
+                .where(*filtros_consulta(busqueda=q))
+                .order_by(ranking.c.puntaje.is_(None), ranking.c.puntaje, Articulo.id)
+                .limit(limit)
+            )
+        else:
+            stmt = select(Articulo).where(*filtros_consulta(busqueda=q)).order_by(Articulo.id).limit(limit)
         
-        return {
-            "articulos": articulos_pagina,
-            "total": total,
-            "page": page,
-            "limit": limit,
-            "total_pages": (total + limit - 1) // limit
-        }
+        resultados = db.scalars(stmt).all()
+        return respuesta_json(
+            query=q,
+            resultados=filas_json.lista(resultados),
+            total_encontrados=len(resultados)
+        )
         
     except Exception as e:
-        return {"error": str(e), "articulos": [], "total": 0}
+        return respuesta_error(f"Error en búsqueda: {str(e)}", resultados=[])
+
+@app.get("/api/inventario/{placa}/detalle")
+def get_detalle_articulo(placa: str, db: Session = Depends(get_db)):
+    """Obtener detalle completo de un artículo por su placa"""
+    try:
+        asegurar_datos()
+        version = version_actual(db)
+        datos = detalle_cache.obtener(placa, version)
+        if datos is None:
+            # Búsqueda por el índice único de placa
+            articulo = db.execute(
+                select(Articulo).where(Articulo.placa == placa, Articulo.activo == True)
+            ).scalar_one_or_none()
+            if articulo is None:
+                return respuesta_error(f"Artículo con placa {placa} no encontrado", encontrado=False, status_code=404)
+            datos = filas_json.codificar(articulo)
+            detalle_cache.guardar(placa, datos, version)
+        return respuesta_json(articulo=datos, encontrado=True)
+        
+    except Exception as e:
+        return respuesta_error(f"Error obteniendo detalle: {str(e)}", encontrado=False)
+
+@app.post("/api/inventario/lookup")
+def lookup_placas(consulta: LookupRequest, db: Session = Depends(get_db)):
+    """Resolver un lote de placas escaneadas en una sola consulta.
+    
+    Devuelve los artículos encontrados (en el orden pedido), las placas que no
+    existen, las que existen pero están dadas de baja y las repetidas en el lote.
+    """
+    try:
+        asegurar_datos()
+        conteo = {}
+        for placa in consulta.placas:
+            placa = placa.strip()
+            if placa:
+                conteo[placa] = conteo.get(placa, 0) + 1
+        
+        # Toda la lista viaja como un único parámetro JSON (sin límite de
+        # variables de SQLite) y se cruza con el índice único de placa
+        placas = text("SELECT value FROM json_each(:placas)").bindparams(placas=json.dumps(list(conteo)))
+        filas = {a.placa: a for a in db.scalars(select(Articulo).where(Articulo.placa.in_(placas)))}
+        
+        encontrados = [filas[p] for p in conteo if p in filas and filas[p].activo]
+        return respuesta_json(
+            encontrados=filas_json.lista(encontrados),
+            faltantes=[p for p in conteo if p not in filas],
+            inactivos=[p for p in conteo if p in filas and not filas[p].activo],
+            duplicados={p: n for p, n in conteo.items() if n > 1},
+            total_solicitadas=len(consulta.placas),
+            total_encontrados=len(encontrados)
+        )
+        
+    except Exception as e:
+        return respuesta_error(str(e), encontrados=[], faltantes=[])
 
 @app.get("/api/inventario/estadisticas")
-async def get_estadisticas():
+def get_estadisticas(db: Session = Depends(get_db)):
     """Estadísticas del inventario"""
     try:
-        articulos = get_google_sheet_data()
+        asegurar_datos()
         
-        if not articulos:
-            return {"error": "No hay datos disponibles"}
+        # Lectura de los agregados materializados (ver database.preparar_estadisticas)
+        total = db.get(Estadistica, ("total", ""))
+        if total is None or not total.cantidad:
+            return respuesta_error("No hay datos disponibles", status_code=503)
         
-        # Calcular estadísticas
-        total_articulos = len(articulos)
-        valor_total = sum(float(art.get('valor', 0)) for art in articulos)
+        def grupos(dimension):
+            return db.query(Estadistica).filter(Estadistica.dimension == dimension, Estadistica.cantidad > 0)
         
-        # Top categorías
-        categorias = {}
-        for art in articulos:
-            cat = art.get('categoria', 'Sin categoría')
-            categorias[cat] = categorias.get(cat, 0) + 1
+        def top(dimension, limite=10):
+            return (
+                grupos(dimension)
+                .order_by(Estadistica.cantidad.desc(), Estadistica.clave)
+                .limit(limite)
+                .all()
+            )
         
         top_categorias = [
-            {"categoria": cat, "cantidad": cant} 
-            for cat, cant in sorted(categorias.items(), key=lambda x: x[1], reverse=True)[:10]
+            {"categoria": fila.clave, "cantidad": fila.cantidad}
+            for fila in top("categoria")
         ]
         
-        # Top responsables
-        responsables = {}
-        for art in articulos:
-            resp = art.get('responsable', 'Sin asignar')
-            responsables[resp] = responsables.get(resp, 0) + 1
-        
         top_responsables = [
-            {"responsable": resp, "cantidad": cant}
-            for resp, cant in sorted(responsables.items(), key=lambda x: x[1], reverse=True)[:10]
+            {"responsable": fila.clave, "cantidad": fila.cantidad}
+            for fila in top("responsable")
         ]
         
         return {
             "resumen": {
-                "total_articulos": total_articulos,
-                "valor_total_inventario": valor_total,
-                "total_categorias": len(categorias),
-                "total_responsables": len(responsables)
+                "total_articulos": total.cantidad,
+                # Suma exacta en centavos; se convierte a pesos una sola vez
+                "valor_total_inventario": total.valor_centavos / 100,
+                "valor_total_centavos": total.valor_centavos,
+                "total_categorias": grupos("categoria").count(),
+                "total_responsables": grupos("responsable").count()
             },
             "top_categorias": top_categorias,
             "top_responsables": top_responsables
         }
         
     except Exception as e:
-        return {"error": str(e)}
+        return respuesta_error(str(e))
 
 @app.get("/api/inventario/categorias")
-async def get_categorias():
+def get_categorias(db: Session = Depends(get_db)):
     """Obtener todas las categorías"""
     try:
-        articulos = get_google_sheet_data()
-        categorias = list(set(art.get('categoria', 'Sin categoría') for art in articulos))
-        return sorted(categorias)
+        asegurar_datos()
+        filas = articulos_activos(db).with_entities(Articulo.categoria).distinct().order_by(Articulo.categoria)
+        return [categoria for (categoria,) in filas]
     except Exception as e:
-        return {"error": str(e), "categorias": []}
+        return respuesta_error(str(e), categorias=[])
 
 @app.get("/api/inventario/responsables") 
-async def get_responsables():
+def get_responsables(db: Session = Depends(get_db)):
     """Obtener todos los responsables"""
     try:
-        articulos = get_google_sheet_data()
-        responsables = list(set(art.get('responsable', 'Sin asignar') for art in articulos))
-        return sorted(responsables)
+        asegurar_datos()
+        filas = articulos_activos(db).with_entities(Articulo.responsable).distinct().order_by(Articulo.responsable)
+        return [responsable for (responsable,) in filas]
     except Exception as e:
-        return {"error": str(e), "responsables": []}
+        return respuesta_error(str(e), responsables=[])
+
+# Auditorías (conteo físico contra el inventario, ver audit.py)
+def obtener_auditoria(db: Session, auditoria_id: int):
+    auditoria = db.get(Auditoria, auditoria_id)
+    if auditoria is None:
+        raise HTTPException(status_code=404, detail=f"Auditoría {auditoria_id} no encontrada")
+    return auditoria
+
+@app.post("/api/auditorias")
+def crear_auditoria(datos: AuditoriaCreate, db: Session = Depends(get_db_escritura)):
+    """Abrir una auditoría; fija las placas que el inventario espera en la ubicación"""
+    if not datos.nombre.strip():
+        raise HTTPException(status_code=400, detail="El nombre es obligatorio")
+    try:
+        asegurar_datos()
+        return audit.resumen_auditoria(audit.crear_auditoria(db, datos.nombre, datos.ubicacion))
+    except Exception as e:
+        return respuesta_error(str(e))
+
+@app.get("/api/auditorias")
+def listar_auditorias(db: Session = Depends(get_db)):
+    """Auditorías con sus contadores, las más recientes primero"""
+    try:
+        return [audit.resumen_auditoria(a) for a in db.query(Auditoria).order_by(Auditoria.id.desc())]
+    except Exception as e:
+        return respuesta_error(str(e), auditorias=[])
+
+@app.get("/api/auditorias/{auditoria_id}")
+def get_auditoria(auditoria_id: int, db: Session = Depends(get_db)):
+    """Resumen de la conciliación (esperados, encontrados, faltantes, inesperados...)"""
+    return audit.resumen_auditoria(obtener_auditoria(db, auditoria_id))
+
+@app.post("/api/auditorias/{auditoria_id}/escaneos")
+def registrar_escaneos(auditoria_id: int, escaneos: EscaneosRequest, db: Session = Depends(get_db_escritura)):
+    """Registrar un lote de placas escaneadas y devolver la clasificación de las nuevas"""
+    auditoria = obtener_auditoria(db, auditoria_id)
+    try:
+        return audit.registrar_escaneos(db, auditoria, escaneos.placas, escaneos.ubicacion)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        return respuesta_error(str(e))
+
+@app.get("/api/auditorias/{auditoria_id}/reporte")
+def reporte_auditoria(
+    auditoria_id: int,
+    tipo: str = Query("faltantes", pattern="^(" + "|".join(audit.TIPOS_REPORTE) + ")$"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Sección del reporte: faltantes, inesperados, ubicacion_incorrecta o encontrados"""
+    auditoria = obtener_auditoria(db, auditoria_id)
+    try:
+        return {"resumen": audit.resumen_auditoria(auditoria), **audit.reporte_auditoria(db, auditoria, tipo, limit, offset)}
+    except Exception as e:
+        return respuesta_error(str(e), filas=[])
+
+@app.post("/api/auditorias/{auditoria_id}/cerrar")
+def cerrar_auditoria(auditoria_id: int, db: Session = Depends(get_db_escritura)):
+    """Cerrar la auditoría; no admite más escaneos"""
+    return audit.resumen_auditoria(audit.cerrar_auditoria(db, obtener_auditoria(db, auditoria_id)))
+
+@app.get("/api/responsables/directorio")
+def get_directorio_responsables(db: Session = Depends(get_db)):
+    """Directorio de responsables que se buscan en las filas de Google Sheets"""
+    try:
+        return [
+            {"id": r.id, "nombre": r.nombre, "alias": r.lista_alias(), "activo": r.activo}
+            for r in db.query(Responsable).order_by(Responsable.id)
+        ]
+    except Exception as e:
+        return respuesta_error(str(e), responsables=[])
+
+@app.post("/api/responsables/directorio")
+def agregar_responsable(responsable: ResponsableCreate, db: Session = Depends(get_db_escritura)):
+    """Agregar un responsable al directorio (se aplica en la próxima sincronización)"""
+    nombre = responsable.nombre.strip()
+    if not nombre:
+        raise HTTPException(status_code=400, detail="El nombre es obligatorio")
+    if db.query(Responsable.id).filter(Responsable.nombre == nombre).first():
+        raise HTTPException(status_code=409, detail=f"{nombre} ya está en el directorio")
+    nuevo = Responsable(nombre=nombre, alias="; ".join(a.strip() for a in responsable.alias if a.strip()))
+    db.add(nuevo)
+    db.commit()
+    return {"id": nuevo.id, "nombre": nuevo.nombre, "alias": nuevo.lista_alias(), "activo": nuevo.activo}
+
+def sincronizador_activo(latido):
+    """Si el proceso sincronizador dio señales de vida hace poco (SYNC_LATIDO_MAXIMO)"""
+    return latido is not None and (datetime.utcnow() - latido).total_seconds() <= SYNC_LATIDO_MAXIMO_SEGUNDOS
 
 @app.post("/api/sync/pull")
 async def sync_pull():
-    """Sincronizar datos desde Google Sheets"""
+    """Sincronizar datos desde Google Sheets (invalida la caché)"""
+    if LECTOR:
+        latido = (await run_in_threadpool(con_sesion, leer_estado_sync))[2]
+        if not sincronizador_activo(latido):
+            # Nadie atendería la solicitud
+            return respuesta_error(
+                "El proceso sincronizador no está activo", status_code=503,
+                latido=latido.isoformat() if latido else None,
+            )
+        solicitada = await run_in_threadpool(con_sesion, solicitar_sync, sesion=SesionEscritura)
+        return JSONResponse(status_code=202, content={
+            "message": "Sincronización solicitada al proceso sincronizador",
+            "solicitada": solicitada.isoformat(),
+        })
     try:
-        articulos = get_google_sheet_data()
+        snapshot = await ejecutar_en_sheets_executor(inventario_cache.refrescar)
         return {
             "message": "Sincronización exitosa",
-            "total_articulos": len(articulos),
-            "timestamp": datetime.utcnow().isoformat()
+            "total_articulos": snapshot.total_articulos,
+            "version": snapshot.version,
+            "cambios": ultima_sincronizacion,
+            "timestamp": snapshot.fecha.isoformat()
         }
+    except asyncio.TimeoutError:
+        return respuesta_error(f"Google Sheets no respondió en {SHEETS_TIMEOUT_SEGUNDOS}s", status_code=504)
     except Exception as e:
-        return {"error": str(e)}
+        return respuesta_error(str(e))
+
+@app.get("/api/sync/estado")
+def sync_estado():
+    """Estado de la sincronización en segundo plano y de la última aplicada"""
+    if LECTOR:
+        estado, solicitada, latido = con_sesion(leer_estado_sync)
+        return {**(estado or {"activo": False}), "rol": ROL_PROCESO,
+                "solicitada": solicitada.isoformat() if solicitada else None,
+                "latido": latido.isoformat() if latido else None,
+                "sincronizador_activo": sincronizador_activo(latido)}
+    return {**programador_sync.estado(), "rol": ROL_PROCESO}
+
+def precargar_google():
+    """Cargar credenciales y token de Google en segundo plano"""
+    def precargar():
+        try:
+            gs_client.precargar(configuracion_google()[1], timeout=SHEETS_TIMEOUT_SEGUNDOS)
+            print("🔐 Cliente de Google Sheets listo")
+        except Exception as e:
+            print(f"⚠️ No se pudo preparar el cliente de Google Sheets: {e}")
+    sheets_executor.submit(precargar)
+
+@app.on_event("startup")
+async def precargar_cliente_google():
+    """Preparar el cliente de Google al arrancar (los workers lector no lo usan)"""
+    if not LECTOR:
+        precargar_google()
+
+@app.on_event("startup")
+async def iniciar_sincronizacion_programada():
+    if LECTOR:
+        return
+    if not os.path.exists(configuracion_google()[1]):
+        print("⚠️ Sin credenciales de Google: sincronización programada desactivada")
+        return
+    programador_sync.iniciar()
+
+@app.on_event("shutdown")
+async def cerrar_sheets_executor():
+    await programador_sync.detener()
+    sheets_executor.shutdown(wait=False, cancel_futures=True)
 
 # Manejo de errores
 @app.exception_handler(HTTPException)
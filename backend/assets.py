@@ -0,0 +1,239 @@
+"""Compresión de respuestas y archivos estáticos del panel (frontend/).
+
+- CompresionMiddleware comprime con brotli (si está instalado) o gzip las
+  respuestas que superan un tamaño mínimo, incluidas las que van en streaming.
+- RecursosEstaticos guarda en memoria los archivos de frontend/ ya comprimidos
+  y los publica con URL versionada por contenido (/static/admin.<hash>.js)
+  para que el navegador los guarde un año; los HTML, que son la entrada, se
+  revalidan siempre con su ETag.
+"""
+import os
+import gzip
+import time
+import hashlib
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli se usa solo gzip
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+# Niveles: rápidos para respuestas dinámicas, máximos para lo precomprimido
+GZIP_NIVEL = 6
+BROTLI_CALIDAD = 5
+# Cada cuánto se mira si frontend/ cambió en disco (0: solo al arrancar)
+ESTATICOS_REVISAR_SEGUNDOS = float(os.getenv("ESTATICOS_REVISAR", "5"))
+
+
+def codificaciones_aceptadas(request_headers):
+    """Codificaciones de Accept-Encoding (sin los parámetros q)"""
+    valor = request_headers.get("accept-encoding", "")
+    return {parte.split(";")[0].strip().lower() for parte in valor.split(",") if parte.strip()}
+
+
+class CompresionMiddleware:
+    """Comprimir respuestas de al menos `minimo` bytes según Accept-Encoding"""
+
+    def __init__(self, app, minimo=1024):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            aceptadas = codificaciones_aceptadas(Headers(scope=scope))
+            if brotli is not None and "br" in aceptadas:
+                await _RespondedorBrotli(self.app, self.minimo)(scope, receive, send)
+                return
+            if "gzip" in aceptadas:
+                await GZipResponder(self.app, self.minimo, compresslevel=GZIP_NIVEL)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _RespondedorBrotli:
+    """Equivalente brotli de starlette.middleware.gzip.GZipResponder"""
+
+    def __init__(self, app, minimo):
+        self.app = app
+        self.minimo = minimo
+        self.send = None
+        self.inicio = None
+        self.comprimir = True
+        self.iniciado = False
+        self.compresor = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self._enviar)
+
+    async def _enviar(self, mensaje):
+        if mensaje["type"] == "http.response.start":
+            # Esperar al primer bloque para decidir las cabeceras
+            self.inicio = mensaje
+            self.comprimir = "content-encoding" not in Headers(raw=mensaje["headers"])
+            return
+        if mensaje["type"] != "http.response.body":
+            await self.send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        mas = mensaje.get("more_body", False)
+        if not self.iniciado:
+            self.iniciado = True
+            if not self.comprimir or (len(cuerpo) < self.minimo and not mas):
+                self.comprimir = False
+                await self.send(self.inicio)
+                await self.send(mensaje)
+                return
+            cabeceras = MutableHeaders(raw=self.inicio["headers"])
+            cabeceras["Content-Encoding"] = "br"
+            cabeceras.add_vary_header("Accept-Encoding")
+            if not mas:
+                cuerpo = brotli.compress(cuerpo, quality=BROTLI_CALIDAD)
+                cabeceras["Content-Length"] = str(len(cuerpo))
+                await self.send(self.inicio)
+                await self.send({"type": "http.response.body", "body": cuerpo})
+                return
+            del cabeceras["Content-Length"]
+            self.compresor = brotli.Compressor(quality=BROTLI_CALIDAD)
+            await self.send(self.inicio)
+        elif not self.comprimir:
+            await self.send(mensaje)
+            return
+
+        datos = self.compresor.process(cuerpo)
+        datos += self.compresor.flush() if mas else self.compresor.finish()
+        await self.send({"type": "http.response.body", "body": datos, "more_body": mas})
+
+
+@dataclass(frozen=True)
+class Recurso:
+    """Archivo estático con sus variantes comprimidas"""
+    nombre: str
+    tipo: str
+    hash: str
+    variantes: dict  # codificación ("identity", "gzip", "br") -> bytes
+
+    @property
+    def nombre_versionado(self):
+        base, punto, extension = self.nombre.rpartition(".")
+        return f"{base}.{self.hash}.{extension}" if punto else f"{self.nombre}.{self.hash}"
+
+
+def _comprimir(nombre, contenido):
+    tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+    variantes = {"identity": contenido}
+    if len(contenido) >= 256:
+        variantes["gzip"] = gzip.compress(contenido, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variantes["br"] = brotli.compress(contenido, quality=11)
+    return Recurso(nombre, tipo, hashlib.sha1(contenido).hexdigest()[:10], variantes)
+
+
+class RecursosEstaticos:
+    """Archivos de `directorio` precomprimidos y con URL versionada.
+
+    Dentro de los HTML las referencias a `prefijo + nombre` se reemplazan por
+    la URL versionada del archivo. Todo se carga y comprime al crear el
+    objeto (al arrancar); después el disco se revisa como mucho cada
+    `revisar` segundos y, si algo cambió, un solo hilo recarga mientras los
+    demás siguen sirviendo la versión anterior.
+    """
+
+    def __init__(self, directorio=FRONTEND_DIR, prefijo="/static/", revisar=ESTATICOS_REVISAR_SEGUNDOS):
+        self.directorio = Path(directorio)
+        self.prefijo = prefijo
+        self.revisar = revisar
+        self._firma = None
+        self._indice = ({}, {})  # (por nombre, por nombre versionado), se reemplaza entero
+        self._revisado_en = time.monotonic()
+        self._lock = threading.Lock()
+        self._cargar()
+
+    def _firma_actual(self):
+        if not self.directorio.is_dir():
+            return ()
+        return tuple(sorted(
+            (str(ruta), ruta.stat().st_mtime_ns) for ruta in self.directorio.rglob("*") if ruta.is_file()
+        ))
+
+    def _cargar(self):
+        firma = self._firma_actual()
+        if firma == self._firma:
+            return
+        archivos = {
+            ruta.relative_to(self.directorio).as_posix(): ruta.read_bytes()
+            for ruta in self.directorio.rglob("*") if ruta.is_file()
+        }
+        recursos = {
+            nombre: _comprimir(nombre, contenido)
+            for nombre, contenido in archivos.items() if not nombre.endswith(".html")
+        }
+        for nombre, contenido in archivos.items():
+            if nombre.endswith(".html"):
+                recursos[nombre] = _comprimir(nombre, self._enlazar(contenido.decode("utf-8"), recursos).encode("utf-8"))
+        self._indice = (recursos, {r.nombre_versionado: r for r in recursos.values()})
+        self._firma = firma
+
+    def _revisar(self):
+        """Recargar si algún archivo cambió, sin mirar el disco más de una vez cada `revisar` segundos"""
+        if self.revisar <= 0 or time.monotonic() - self._revisado_en < self.revisar:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # otro hilo ya está revisando
+        try:
+            self._revisado_en = time.monotonic()
+            self._cargar()
+        finally:
+            self._lock.release()
+
+    def _enlazar(self, html, recursos):
+        """Reemplazar /static/<nombre> por la URL versionada en un HTML"""
+        def versionar(coincidencia):
+            recurso = recursos.get(coincidencia.group(2))
+            if recurso is None:
+                return coincidencia.group(0)
+            return f"{coincidencia.group(1)}{self.prefijo}{recurso.nombre_versionado}{coincidencia.group(1)}"
+        return re.sub(rf"""(["']){re.escape(self.prefijo)}([^"'?#]+)\1""", versionar, html)
+
+    def buscar(self, nombre):
+        """(recurso, versionado) para un nombre simple o versionado; None si no existe"""
+        self._revisar()
+        recursos, versionados = self._indice
+        if nombre in versionados:
+            return versionados[nombre], True
+        if nombre in recursos:
+            return recursos[nombre], False
+        return None
+
+    def respuesta(self, request, nombre):
+        """Respuesta con la mejor variante aceptada, o None si el archivo no existe"""
+        encontrado = self.buscar(nombre)
+        if encontrado is None:
+            return None
+        recurso, versionado = encontrado
+        cabeceras = {
+            "ETag": f'"{recurso.hash}"',
+            "Cache-Control": CACHE_INMUTABLE if versionado else "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if f'"{recurso.hash}"' in if_none_match or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=cabeceras)
+
+        aceptadas = codificaciones_aceptadas(request.headers)
+        for codificacion in ("br", "gzip"):
+            if codificacion in recurso.variantes and codificacion in aceptadas:
+                cabeceras["Content-Encoding"] = codificacion
+                return Response(recurso.variantes[codificacion], media_type=recurso.tipo, headers=cabeceras)
+        return Response(recurso.variantes["identity"], media_type=recurso.tipo, headers=cabeceras)
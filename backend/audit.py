@@ -0,0 +1,186 @@
+"""Conciliación de conteos físicos (auditorías) contra el inventario.
+
+Al abrir una auditoría se guarda el conjunto de placas esperadas en su
+ubicación. Cada lote de escaneos solo toca las placas nuevas del lote: se
+clasifican con el índice único de placa, se marcan en el conjunto esperado y
+se ajustan los contadores, así el reporte (faltantes, inesperados, ubicación
+incorrecta) está al día sin recalcular la sede completa. Los contadores se
+suman en el propio UPDATE (x = x + n): dos lotes concurrentes de la misma
+auditoría no se pisan.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, func, text, literal, false
+
+from database import Articulo, Auditoria, EsperadoAuditoria, EscaneoAuditoria
+from ingest import normalizar_ubicacion
+
+TIPOS_REPORTE = ("faltantes", "inesperados", "ubicacion_incorrecta", "encontrados")
+# Sección del reporte -> resultado del escaneo
+RESULTADOS_REPORTE = {"inesperados": "inesperado", "ubicacion_incorrecta": "ubicacion_incorrecta", "encontrados": "encontrado"}
+
+
+def _en_lista(placas):
+    """Subconsulta con las placas como un único parámetro JSON (json_each)"""
+    return text("SELECT value FROM json_each(:placas)").bindparams(placas=json.dumps(list(placas)))
+
+
+def resumen_auditoria(auditoria):
+    return {
+        "id": auditoria.id,
+        "nombre": auditoria.nombre,
+        "ubicacion": auditoria.ubicacion,
+        "estado": auditoria.estado,
+        "fecha_creacion": auditoria.fecha_creacion.isoformat() if auditoria.fecha_creacion else None,
+        "fecha_cierre": auditoria.fecha_cierre.isoformat() if auditoria.fecha_cierre else None,
+        "esperados": auditoria.esperados,
+        "encontrados": auditoria.encontrados,
+        "faltantes": auditoria.esperados - auditoria.encontrados,
+        "escaneados": auditoria.escaneados,
+        "inesperados": auditoria.inesperados,
+        "ubicacion_incorrecta": auditoria.ubicacion_incorrecta,
+    }
+
+
+def crear_auditoria(db, nombre, ubicacion=None):
+    """Abrir una auditoría y fijar las placas esperadas (activas en la ubicación)"""
+    ubicacion = (ubicacion or "").strip() or None
+    auditoria = Auditoria(nombre=nombre.strip(), ubicacion=ubicacion, fecha_creacion=datetime.utcnow())
+    db.add(auditoria)
+    db.flush()
+
+    condiciones = [Articulo.activo == True]
+    if ubicacion is not None:
+        condiciones.append(Articulo.ubicacion_clave == normalizar_ubicacion(ubicacion))
+    # INSERT ... SELECT: el filtro lo resuelve SQLite con el índice de ubicacion_clave
+    auditoria.esperados = db.execute(
+        insert(EsperadoAuditoria).from_select(
+            ["auditoria_id", "placa", "encontrado"],
+            select(literal(auditoria.id), Articulo.placa, false()).where(*condiciones),
+        )
+    ).rowcount
+    db.commit()
+    return auditoria
+
+
+def registrar_escaneos(db, auditoria, placas, ubicacion=None):
+    """Aplicar un lote de placas escaneadas y devolver lo que cambió.
+
+    Las placas ya escaneadas en la sesión se ignoran (se informan como
+    repetidas). `ubicacion` es dónde se escanea; por defecto la de la auditoría.
+    """
+    if auditoria.estado != "abierta":
+        raise ValueError("La auditoría está cerrada")
+    ubicacion = (ubicacion or "").strip() or auditoria.ubicacion
+    lote = list(dict.fromkeys(p.strip() for p in placas if p and p.strip()))
+
+    repetidas = set(db.scalars(
+        select(EscaneoAuditoria.placa)
+        .where(EscaneoAuditoria.auditoria_id == auditoria.id, EscaneoAuditoria.placa.in_(_en_lista(lote)))
+    ))
+    nuevas = [placa for placa in lote if placa not in repetidas]
+
+    # Clasificar contra el inventario actual (índice único de placa)
+    registradas = dict(db.execute(
+        select(Articulo.placa, Articulo.ubicacion_clave)
+        .where(Articulo.activo == True, Articulo.placa.in_(_en_lista(nuevas)))
+    ).all())
+    clave = normalizar_ubicacion(ubicacion)
+    ahora = datetime.utcnow()
+    escaneos = []
+    for placa in nuevas:
+        if placa not in registradas:
+            resultado = "inesperado"
+        elif ubicacion and registradas[placa] != clave:
+            resultado = "ubicacion_incorrecta"
+        else:
+            resultado = "encontrado"
+        escaneos.append({
+            "auditoria_id": auditoria.id, "placa": placa, "ubicacion": ubicacion,
+            "resultado": resultado, "fecha": ahora,
+        })
+    if escaneos:
+        db.execute(insert(EscaneoAuditoria), escaneos)
+
+    # Esperadas que aparecen (aunque sea en otra ubicación) dejan de faltar
+    esperadas_encontradas = 0
+    if nuevas:
+        esperadas_encontradas = db.execute(
+            update(EsperadoAuditoria)
+            .where(
+                EsperadoAuditoria.auditoria_id == auditoria.id,
+                EsperadoAuditoria.encontrado == False,
+                EsperadoAuditoria.placa.in_(_en_lista(nuevas)),
+            )
+            .values(encontrado=True, fecha_encontrado=ahora)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    por_resultado = {"encontrado": 0, "inesperado": 0, "ubicacion_incorrecta": 0}
+    for escaneo in escaneos:
+        por_resultado[escaneo["resultado"]] += 1
+    db.execute(
+        update(Auditoria)
+        .where(Auditoria.id == auditoria.id)
+        .values(
+            escaneados=Auditoria.escaneados + len(escaneos),
+            encontrados=Auditoria.encontrados + esperadas_encontradas,
+            inesperados=Auditoria.inesperados + por_resultado["inesperado"],
+            ubicacion_incorrecta=Auditoria.ubicacion_incorrecta + por_resultado["ubicacion_incorrecta"],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()  # expira `auditoria`: el resumen relee los contadores
+
+    return {
+        "nuevas": len(escaneos),
+        "repetidas": [placa for placa in lote if placa in repetidas],
+        "inesperados": [e["placa"] for e in escaneos if e["resultado"] == "inesperado"],
+        "ubicacion_incorrecta": [e["placa"] for e in escaneos if e["resultado"] == "ubicacion_incorrecta"],
+        "resumen": resumen_auditoria(auditoria),
+    }
+
+
+def cerrar_auditoria(db, auditoria):
+    auditoria.estado = "cerrada"
+    auditoria.fecha_cierre = datetime.utcnow()
+    db.commit()
+    return auditoria
+
+
+def reporte_auditoria(db, auditoria, tipo, limit=100, offset=0):
+    """Filas de una sección del reporte, con los datos del artículo cuando existe"""
+    if tipo not in TIPOS_REPORTE:
+        raise ValueError(f"Tipo de reporte inválido: {tipo}")
+
+    if tipo == "faltantes":
+        condicion = (EsperadoAuditoria.auditoria_id == auditoria.id, EsperadoAuditoria.encontrado == False)
+        total = db.scalar(select(func.count()).select_from(EsperadoAuditoria).where(*condicion))
+        stmt = (
+            select(EsperadoAuditoria.placa, Articulo.nombre, Articulo.ubicacion, Articulo.responsable)
+            .outerjoin(Articulo, Articulo.placa == EsperadoAuditoria.placa)
+            .where(*condicion)
+            .order_by(EsperadoAuditoria.placa)
+        )
+    else:
+        resultado = RESULTADOS_REPORTE[tipo]
+        condicion = (EscaneoAuditoria.auditoria_id == auditoria.id, EscaneoAuditoria.resultado == resultado)
+        total = db.scalar(select(func.count()).select_from(EscaneoAuditoria).where(*condicion))
+        stmt = (
+            select(
+                EscaneoAuditoria.placa, Articulo.nombre, Articulo.ubicacion, Articulo.responsable,
+                EscaneoAuditoria.ubicacion.label("ubicacion_escaneo"), EscaneoAuditoria.fecha,
+            )
+            .outerjoin(Articulo, Articulo.placa == EscaneoAuditoria.placa)
+            .where(*condicion)
+            .order_by(EscaneoAuditoria.id)
+        )
+
+    filas = []
+    for fila in db.execute(stmt.offset(offset).limit(limit)):
+        datos = dict(fila._mapping)
+        if datos.get("fecha"):
+            datos["fecha"] = datos["fecha"].isoformat()
+        filas.append(datos)
+    return {"tipo": tipo, "total": total, "filas": filas}
@@ -0,0 +1,473 @@
+"""Base de datos SQLite del inventario: modelo, esquema e índice de búsqueda."""
+import re
+import sys
+import json
+import importlib.util
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, Text, Boolean, Index
+from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from ingest import NOMBRES_CONOCIDOS, fecha_a_dia, normalizar_ubicacion
+from money import a_centavos
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _cargar_settings():
+    """config/settings.py del proyecto, cargado por ruta: otro módulo `config`
+    en sys.path (o ya importado) no puede reemplazarlo"""
+    spec = importlib.util.spec_from_file_location("inventario_settings", RAIZ / "config" / "settings.py")
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+settings = sys.modules.get("inventario_settings") or _cargar_settings()
+
+def url_base_datos(url):
+    """URL de la base con la ruta relativa de SQLite resuelta desde la raíz del proyecto"""
+    url = make_url(url)
+    ruta = url.database
+    if url.get_backend_name() == "sqlite" and ruta and ruta != ":memory:" and not ruta.startswith("file:"):
+        if not Path(ruta).is_absolute():
+            url = url.set(database=str(settings.BASE_DIR / ruta))
+    return url
+
+# Configuración de base de datos (compartida por app.py y sync_gs.py)
+DATABASE_URL = url_base_datos(settings.DATABASE_URL)
+EN_ARCHIVO = DATABASE_URL.get_backend_name() == "sqlite" and DATABASE_URL.database not in (None, "", ":memory:")
+
+def _configurar_conexion(conexion, registro):
+    """PRAGMAs de cada conexión SQLite nueva.
+    
+    WAL: las lecturas no esperan a la escritura de la sincronización (ven la
+    versión anterior hasta el commit). synchronous=NORMAL es seguro con WAL y
+    evita un fsync por commit; mmap y cache_size mantienen las páginas
+    calientes en memoria; busy_timeout espera el lock en lugar de fallar.
+    """
+    cursor = conexion.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_MB * 1024}")  # negativo: en KiB
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_ESPERA_MS}")
+    cursor.close()
+
+def crear_engine(conexiones):
+    opciones = {"pool_size": conexiones, "max_overflow": 0} if EN_ARCHIVO else {}
+    motor = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, **opciones)
+    if motor.dialect.name == "sqlite":
+        event.listen(motor, "connect", _configurar_conexion)
+    return motor
+
+# Pool de lectura para las peticiones y una única conexión de escritura para
+# la sincronización y el esquema
+engine = crear_engine(settings.SQLITE_LECTORES)
+engine_escritura = crear_engine(1)
+
+if engine_escritura.dialect.name == "sqlite":
+    @event.listens_for(engine_escritura, "connect")
+    def _sin_transaccion_implicita(conexion, registro):
+        conexion.isolation_level = None
+
+    @event.listens_for(engine_escritura, "begin")
+    def _begin_inmediato(conn):
+        # Tomar el lock de escritura al empezar: sin BUSY a mitad de la transacción
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SesionEscritura = sessionmaker(autocommit=False, autoflush=False, bind=engine_escritura)
+Base = declarative_base()
+
+# Campos del artículo que vienen de Google Sheets
+CAMPOS_ARTICULO = [
+    "placa", "nombre", "marca", "modelo", "categoria", "descripcion", "valor",
+    "fecha_adquisicion", "ubicacion", "responsable", "observaciones",
+    "consecutivo", "tipo_elemento", "hoja_origen",
+]
+
+# Modelos de base de datos
+class Articulo(Base):
+    __tablename__ = "articulos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    placa = Column(String, unique=True, index=True)
+    nombre = Column(String, index=True)
+    marca = Column(String)
+    modelo = Column(String)
+    categoria = Column(String, index=True)
+    descripcion = Column(Text)
+    valor = Column(String)
+    fecha_adquisicion = Column(String)
+    ubicacion = Column(String)
+    responsable = Column(String, index=True)
+    observaciones = Column(Text)
+    consecutivo = Column(String)
+    tipo_elemento = Column(String)
+    hoja_origen = Column(String)
+    # Derivadas de valor y fecha_adquisicion (texto) para filtrar por rango y
+    # de ubicacion para compararla sin tildes ni mayúsculas (auditorías)
+    valor_centavos = Column(Integer, index=True)
+    dia_adquisicion = Column(Date, index=True)
+    ubicacion_clave = Column(String, index=True)
+    huella = Column(String)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    fecha_actualizacion = Column(DateTime, default=datetime.utcnow)
+    activo = Column(Boolean, default=True)
+
+class Estadistica(Base):
+    """Agregados del inventario activo, mantenidos por triggers sobre articulos"""
+    __tablename__ = "estadisticas"
+    
+    dimension = Column(String, primary_key=True)  # "total", "categoria" o "responsable"
+    clave = Column(String, primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+    valor_centavos = Column(Integer, nullable=False, default=0)  # suma exacta, en centavos
+    
+    __table_args__ = (Index("ix_estadisticas_dimension_cantidad", "dimension", "cantidad"),)
+
+class Responsable(Base):
+    """Directorio de responsables que se buscan en las filas sin responsable explícito"""
+    __tablename__ = "responsables"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String, unique=True, nullable=False)
+    alias = Column(Text, default="")  # otras formas del nombre, separadas por ";"
+    activo = Column(Boolean, default=True)
+    
+    def lista_alias(self):
+        return [a.strip() for a in (self.alias or "").split(";") if a.strip()]
+
+class Auditoria(Base):
+    """Sesión de conteo físico de una ubicación (o de toda la sede si no tiene ubicación).
+    
+    Los contadores se actualizan con cada lote de escaneos; faltantes es
+    esperados - encontrados.
+    """
+    __tablename__ = "auditorias"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String, nullable=False)
+    ubicacion = Column(String)
+    estado = Column(String, nullable=False, default="abierta")  # "abierta" o "cerrada"
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    fecha_cierre = Column(DateTime)
+    esperados = Column(Integer, nullable=False, default=0)
+    encontrados = Column(Integer, nullable=False, default=0)
+    escaneados = Column(Integer, nullable=False, default=0)
+    inesperados = Column(Integer, nullable=False, default=0)
+    ubicacion_incorrecta = Column(Integer, nullable=False, default=0)
+
+class EsperadoAuditoria(Base):
+    """Placas que el inventario ubicaba en la auditoría al abrirla"""
+    __tablename__ = "auditoria_esperados"
+    
+    auditoria_id = Column(Integer, ForeignKey("auditorias.id"), primary_key=True)
+    placa = Column(String, primary_key=True)
+    encontrado = Column(Boolean, nullable=False, default=False)
+    fecha_encontrado = Column(DateTime)
+    
+    __table_args__ = (Index("ix_auditoria_esperados_pendientes", "auditoria_id", "encontrado"),)
+
+class EscaneoAuditoria(Base):
+    """Placa escaneada en una auditoría (una vez por sesión) y su clasificación"""
+    __tablename__ = "auditoria_escaneos"
+    
+    id = Column(Integer, primary_key=True)
+    auditoria_id = Column(Integer, ForeignKey("auditorias.id"), nullable=False)
+    placa = Column(String, nullable=False)
+    ubicacion = Column(String)  # dónde se escaneó
+    resultado = Column(String, nullable=False)  # "encontrado", "inesperado" o "ubicacion_incorrecta"
+    fecha = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("auditoria_id", "placa", name="uq_auditoria_escaneos_placa"),
+        Index("ix_auditoria_escaneos_resultado", "auditoria_id", "resultado"),
+    )
+
+class EstadoDatos(Base):
+    """Versión de los datos de articulos (una sola fila, id=1)"""
+    __tablename__ = "estado_datos"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(String, nullable=False)  # hash de placa+huella de los artículos activos
+    modificado = Column(DateTime, nullable=False)
+    # Con serve.py: estado publicado por el proceso sincronizador (JSON),
+    # última sincronización pedida por un worker y último latido del
+    # sincronizador (None si se detuvo)
+    sync_estado = Column(Text)
+    sync_solicitada = Column(DateTime)
+    sync_latido = Column(DateTime)
+
+# Columnas de articulos calculadas a partir de las de texto
+COLUMNAS_DERIVADAS = ("valor_centavos", "dia_adquisicion", "ubicacion_clave")
+
+def columnas_tipadas(fila):
+    """valor_centavos, dia_adquisicion y ubicacion_clave a partir de los campos de texto del artículo"""
+    return {
+        "valor_centavos": a_centavos(fila.get("valor")),
+        "dia_adquisicion": fecha_a_dia(fila.get("fecha_adquisicion")),
+        "ubicacion_clave": normalizar_ubicacion(fila.get("ubicacion")),
+    }
+
+def _calcular_version(db):
+    contenido = hashlib.sha1()
+    filas = db.execute(text("SELECT placa, huella FROM articulos WHERE activo ORDER BY placa"))
+    for placa, huella in filas:
+        contenido.update(f"{placa}\0{huella}\n".encode("utf-8"))
+    return contenido.hexdigest()[:16]
+
+def _crear_estado(db, version, modificado):
+    # INSERT OR IGNORE: con varios procesos otro puede haber creado la fila
+    db.execute(sqlite_insert(EstadoDatos).values(id=1, version=version, modificado=modificado).on_conflict_do_nothing())
+    return db.get(EstadoDatos, 1)
+
+def registrar_version(db):
+    """Recalcular la versión de los datos tras modificar articulos (sin commit)"""
+    version = _calcular_version(db)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    estado = db.get(EstadoDatos, 1) or _crear_estado(db, version, ahora)
+    if estado.version != version:
+        estado.version = version
+        estado.modificado = ahora
+    return estado.version, estado.modificado
+
+def leer_version(db):
+    """(versión, fecha de modificación) de los datos; (None, None) si aún no se registró"""
+    estado = db.get(EstadoDatos, 1)
+    if estado is None:
+        return None, None
+    return estado.version, estado.modificado
+
+def asegurar_version(db):
+    """Como leer_version, pero calcula y guarda la versión si aún no existe (sesión de escritura).
+    
+    Solo crea la fila, nunca la actualiza: la versión calculada aquí puede venir
+    de una lectura anterior a la sincronización que otro proceso está guardando.
+    """
+    estado = _estado(db)
+    version, modificado = estado.version, estado.modificado
+    db.commit()
+    return version, modificado
+
+def _estado(db):
+    return db.get(EstadoDatos, 1) or _crear_estado(db, _calcular_version(db), datetime.utcnow().replace(microsecond=0))
+
+def publicar_estado_sync(db, datos):
+    """Guardar el estado de la sincronización para los demás procesos"""
+    _estado(db).sync_estado = json.dumps(datos, default=str)
+    db.commit()
+
+def solicitar_sync(db):
+    """Pedir al proceso sincronizador una sincronización inmediata"""
+    estado = _estado(db)
+    estado.sync_solicitada = datetime.utcnow()
+    db.commit()
+    return estado.sync_solicitada
+
+def latido_sync(db, activo=True):
+    """Registrar que el sincronizador sigue vivo (o que se detuvo) y devolver la última solicitud"""
+    estado = _estado(db)
+    estado.sync_latido = datetime.utcnow() if activo else None
+    solicitada = estado.sync_solicitada
+    db.commit()
+    return solicitada
+
+def leer_estado_sync(db):
+    """(estado publicado o None, fecha de la última solicitud, último latido del sincronizador)"""
+    estado = db.get(EstadoDatos, 1)
+    if estado is None:
+        return None, None, None
+    publicado = json.loads(estado.sync_estado) if estado.sync_estado else None
+    return publicado, estado.sync_solicitada, estado.sync_latido
+
+def preparar_esquema():
+    """Crear tablas y completar columnas faltantes en bases existentes.
+    
+    Las bases generadas por crear_prototipo.py o por sync_gs.py usan otro
+    esquema para `articulos`; se renombran para no perder esos datos.
+    """
+    with engine_escritura.begin() as conn:
+        inspector = inspect(conn)
+        for tabla in Base.metadata.sorted_tables:
+            if not inspector.has_table(tabla.name):
+                continue
+            columnas = {c["name"] for c in inspector.get_columns(tabla.name)}
+            if tabla.name == "articulos" and "nombre" not in columnas:
+                legado = f"articulos_legado_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                print(f"⚠️ Tabla articulos con esquema antiguo, renombrada a {legado}")
+                conn.execute(text(f'ALTER TABLE articulos RENAME TO "{legado}"'))
+                continue
+            for columna in tabla.columns:
+                if columna.name not in columnas:
+                    tipo = columna.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{tabla.name}" ADD COLUMN "{columna.name}" {tipo}'))
+            for indice in tabla.indexes:
+                indice.create(conn, checkfirst=True)
+            if tabla.name == "articulos" and not columnas.issuperset(COLUMNAS_DERIVADAS):
+                completar_columnas_tipadas(conn)
+    Base.metadata.create_all(bind=engine_escritura)
+
+def completar_columnas_tipadas(conn):
+    """Calcular las columnas derivadas en filas guardadas antes de que existieran"""
+    filas = conn.execute(text("SELECT id, valor, fecha_adquisicion, ubicacion FROM articulos")).mappings().all()
+    if filas:
+        conn.execute(
+            Articulo.__table__.update().where(Articulo.id == bindparam("fila_id")),
+            [{"fila_id": fila["id"], **columnas_tipadas(fila)} for fila in filas],
+        )
+        print(f"🔢 Valores, fechas y ubicaciones tipados en {len(filas)} artículos")
+
+def sembrar_responsables():
+    """Cargar el directorio inicial de responsables si la tabla está vacía"""
+    db = SesionEscritura()
+    try:
+        if db.query(Responsable.id).first() is None:
+            db.add_all(Responsable(nombre=nombre) for nombre in NOMBRES_CONOCIDOS)
+            db.commit()
+    finally:
+        db.close()
+
+# Índice de texto completo (SQLite FTS5) sincronizado con articulos mediante
+# triggers; sin acentos y con índices de prefijo para buscar mientras se escribe
+COLUMNAS_FTS = ["placa", "nombre", "descripcion", "categoria", "marca", "modelo", "responsable"]
+PESOS_FTS = [10.0, 5.0, 1.0, 2.0, 2.0, 2.0, 1.0]
+# Índice de trigramas para buscar subcadenas ("16217" en la placa
+# 92271016217, "FI302" en el modelo DFI302 que va en el nombre). La
+# descripción, larga, queda en el índice por palabras: con trigramas
+# duplicaría el tamaño de la base
+COLUMNAS_TRIGRAMAS = ["placa", "nombre"]
+
+def _indice_fts(conn, tabla, columnas, opciones):
+    """Tabla FTS5 externa sobre articulos con sus triggers; se llena si es nueva"""
+    lista = ", ".join(columnas)
+    nuevos = ", ".join(f"new.{c}" for c in columnas)
+    viejos = ", ".join(f"old.{c}" for c in columnas)
+    existia = inspect(conn).has_table(tabla)
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla} USING fts5("
+        f"{lista}, content='articulos', content_rowid='id', {opciones})"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_ai AFTER INSERT ON articulos BEGIN "
+        f"INSERT INTO {tabla}(rowid, {lista}) VALUES (new.id, {nuevos}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_ad AFTER DELETE ON articulos BEGIN "
+        f"INSERT INTO {tabla}({tabla}, rowid, {lista}) VALUES ('delete', old.id, {viejos}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_au AFTER UPDATE OF {lista} ON articulos BEGIN "
+        f"INSERT INTO {tabla}({tabla}, rowid, {lista}) VALUES ('delete', old.id, {viejos}); "
+        f"INSERT INTO {tabla}(rowid, {lista}) VALUES (new.id, {nuevos}); END"
+    )
+    if not existia:
+        conn.exec_driver_sql(f"INSERT INTO {tabla}({tabla}) VALUES ('rebuild')")
+
+def preparar_busqueda():
+    """Crear las tablas FTS5 (palabras y trigramas) y sus triggers"""
+    try:
+        with engine_escritura.begin() as conn:
+            _indice_fts(conn, "articulos_fts", COLUMNAS_FTS, "tokenize='unicode61 remove_diacritics 2', prefix='2 3'")
+    except Exception as e:
+        print(f"⚠️ FTS5 no disponible, búsqueda por LIKE: {e}")
+        return
+    try:
+        with engine_escritura.begin() as conn:
+            _indice_fts(conn, "articulos_trigramas", COLUMNAS_TRIGRAMAS, "tokenize='trigram'")
+    except Exception as e:
+        print(f"⚠️ FTS5 sin tokenizador trigram (SQLite < 3.34), subcadenas por LIKE: {e}")
+
+def expresion_fts(texto: str):
+    """Convertir texto libre en una consulta FTS5: todos los términos, por prefijo"""
+    terminos = re.findall(r"\w+", texto)
+    if not terminos:
+        return None
+    return " ".join(f'"{t}"*' for t in terminos)
+
+def expresion_subcadena(texto: str):
+    """Consulta de la tabla de trigramas equivalente a LIKE '%texto%' (None con menos de 3 caracteres)"""
+    texto = texto.strip()
+    if len(texto) < 3:
+        return None
+    return '"' + texto.replace('"', '""') + '"'
+
+# Estadísticas materializadas: cada cambio en articulos ajusta los contadores
+# de su categoría, su responsable y el total, sin recorrer la tabla
+DIMENSIONES_ESTADISTICAS = {"total": "''", "categoria": "categoria", "responsable": "responsable"}
+
+def _sql_ajuste_estadisticas(fila, signo):
+    sentencias = []
+    for dimension, columna in DIMENSIONES_ESTADISTICAS.items():
+        clave = columna if columna == "''" else f"COALESCE({fila}.{columna}, '')"
+        sentencias.append(
+            f"INSERT INTO estadisticas(dimension, clave, cantidad, valor_centavos) "
+            f"SELECT '{dimension}', {clave}, {signo}1, {signo}COALESCE({fila}.valor_centavos, 0) "
+            f"WHERE {fila}.activo "
+            f"ON CONFLICT(dimension, clave) DO UPDATE SET "
+            f"cantidad = cantidad + excluded.cantidad, valor_centavos = valor_centavos + excluded.valor_centavos;"
+        )
+    return " ".join(sentencias)
+
+def reconstruir_estadisticas(conn):
+    """Recalcular las estadísticas desde cero a partir de articulos"""
+    conn.exec_driver_sql("DELETE FROM estadisticas")
+    for dimension, columna in DIMENSIONES_ESTADISTICAS.items():
+        clave = columna if columna == "''" else f"COALESCE({columna}, '')"
+        conn.exec_driver_sql(
+            f"INSERT INTO estadisticas(dimension, clave, cantidad, valor_centavos) "
+            f"SELECT '{dimension}', {clave}, COUNT(*), COALESCE(SUM(valor_centavos), 0) "
+            f"FROM articulos WHERE activo GROUP BY {clave}"
+        )
+
+def preparar_estadisticas():
+    """Crear los triggers que mantienen la tabla estadisticas (calculada desde cero la primera vez)"""
+    limpiar = "DELETE FROM estadisticas WHERE cantidad <= 0 AND dimension <> 'total';"
+    with engine_escritura.begin() as conn:
+        existian = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'articulos_estadisticas_ai'"
+        ).scalar() is not None
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS articulos_estadisticas_ai AFTER INSERT ON articulos BEGIN "
+            f"{_sql_ajuste_estadisticas('new', '+')} END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS articulos_estadisticas_ad AFTER DELETE ON articulos BEGIN "
+            f"{_sql_ajuste_estadisticas('old', '-')} {limpiar} END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS articulos_estadisticas_au "
+            f"AFTER UPDATE OF activo, categoria, responsable, valor_centavos ON articulos BEGIN "
+            f"{_sql_ajuste_estadisticas('old', '-')} {_sql_ajuste_estadisticas('new', '+')} {limpiar} END"
+        )
+        if not existian:
+            reconstruir_estadisticas(conn)
+
+def inicializar():
+    """Esquema, directorio inicial, estadísticas e índices de búsqueda.
+    
+    Con serve.py lo ejecuta una sola vez el proceso principal antes de lanzar
+    el sincronizador y los workers, que no hacen DDL al importar el módulo.
+    """
+    preparar_esquema()
+    sembrar_responsables()
+    preparar_estadisticas()
+    preparar_busqueda()
+
+def busqueda_disponible(tabla="articulos_fts"):
+    """Si existe la tabla FTS5 (la crea inicializar, que puede correr en otro proceso)"""
+    with engine.connect() as conn:
+        return inspect(conn).has_table(tabla)
+
+if settings.INVENTARIO_ROL == "completo":
+    inicializar()
+BUSQUEDA_FTS = busqueda_disponible()
+BUSQUEDA_SUBCADENAS = busqueda_disponible("articulos_trigramas")
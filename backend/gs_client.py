@@ -0,0 +1,94 @@
+"""Clientes de Google Sheets compartidos por app.py, sync_gs.py y los scripts.
+
+Las credenciales de la cuenta de servicio se leen una sola vez por archivo y
+cada combinación de credenciales y permisos tiene un único cliente gspread de
+larga duración. El cliente usa una sesión HTTP con keep-alive (AuthorizedSession
+de google-auth) y el token de acceso se reutiliza hasta que está por vencer;
+google-auth lo renueva solo antes de la siguiente petición.
+"""
+import os
+import threading
+
+import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
+from requests.adapters import HTTPAdapter
+
+SCOPES_LECTURA = (
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.readonly",
+)
+SCOPES_ESCRITURA = (
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+)
+
+# Conexiones keep-alive por host; igual o mayor que los hilos que usan el cliente
+CONEXIONES_POR_HOST = int(os.getenv("SHEETS_CONEXIONES", "4"))
+
+_lock = threading.Lock()
+_credenciales = {}
+_clientes = {}
+
+
+def credenciales(credentials_path, scopes=SCOPES_LECTURA):
+    """Credenciales de la cuenta de servicio, leídas del disco una sola vez"""
+    clave = (os.path.abspath(credentials_path), tuple(scopes))
+    with _lock:
+        if clave not in _credenciales:
+            if not os.path.exists(credentials_path):
+                raise FileNotFoundError(f"Credenciales no encontradas: {credentials_path}")
+            _credenciales[clave] = Credentials.from_service_account_file(credentials_path, scopes=list(scopes))
+        return _credenciales[clave]
+
+
+def obtener_cliente(credentials_path, scopes=SCOPES_LECTURA, timeout=None):
+    """Cliente gspread autorizado y reutilizable para estas credenciales y permisos"""
+    clave = (os.path.abspath(credentials_path), tuple(scopes))
+    cliente = _clientes.get(clave)
+    if cliente is not None:
+        return cliente
+    creds = credenciales(credentials_path, scopes)
+    with _lock:
+        if clave not in _clientes:
+            cliente = gspread.authorize(creds)
+            sesion = getattr(cliente, "session", None)
+            if sesion is not None:
+                adaptador = HTTPAdapter(pool_connections=CONEXIONES_POR_HOST, pool_maxsize=CONEXIONES_POR_HOST)
+                sesion.mount("https://", adaptador)
+            if timeout:
+                cliente.set_timeout(timeout)
+            _clientes[clave] = cliente
+        return _clientes[clave]
+
+
+def precargar(credentials_path, scopes=SCOPES_LECTURA, timeout=None):
+    """Crear el cliente y pedir el token de acceso por adelantado (al arrancar)"""
+    cliente = obtener_cliente(credentials_path, scopes, timeout)
+    creds = credenciales(credentials_path, scopes)
+    if not creds.valid:
+        creds.refresh(Request())
+    return cliente
+
+
+def revision_archivo(cliente, file_id):
+    """Marca de la última modificación del archivo en Drive.
+
+    Es una sola petición pequeña a Drive (files.get con fields=version,
+    modifiedTime), sin abrir el libro ni leer valores; sirve para saber si
+    hace falta sincronizar.
+    """
+    respuesta = cliente.request(
+        "get", f"{DRIVE_FILES_API_V3_URL}/{file_id}",
+        params={"fields": "version,modifiedTime", "supportsAllDrives": True},
+    )
+    datos = respuesta.json()
+    return f"{datos.get('version', '')}:{datos.get('modifiedTime', '')}"
+
+
+def olvidar_clientes():
+    """Descartar credenciales y clientes (p. ej. tras cambiar credentials.json)"""
+    with _lock:
+        _credenciales.clear()
+        _clientes.clear()
@@ -0,0 +1,281 @@
+"""Normalización columnar de las hojas de inventario (Google Sheets / Excel).
+
+Trabaja sobre la matriz completa de valores columna por columna en lugar de
+construir un dict por fila. Las columnas de inventario repiten mucho sus
+valores (categorías, marcas, ubicaciones, precios), así que cada limpieza se
+aplica una sola vez por valor distinto (pd.factorize) y el resultado se
+reparte a las filas con indexación de NumPy.
+"""
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from money import centavos_columna, texto_decimal
+
+# Valores que no cuentan como placa válida
+PLACAS_INVALIDAS = {"", "nan", "none", "null", "placa"}
+# Marca/modelo que no se agregan al nombre (y que se vacían, salvo ".")
+VACIOS_NOMBRE = {"NA", "N/A", ".", "NAN"}
+VACIOS_MARCA_MODELO = {"NA", "N/A", "NAN"}
+
+CAMPOS_RESPONSABLE = ["Centro/R", "Responsable", "Custodio", "Usuario"]
+RESPONSABLES_IGNORADOS = {"76,922710", "76.922710", "", "NA"}
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+# Directorio inicial de responsables (la tabla `responsables` lo reemplaza)
+NOMBRES_CONOCIDOS = [
+    "ALVAREZ DIAZ JUAN GONZALO",
+    "MANTILLA ARENAS WILLIAM",
+    "ALEXANDER ZAPATA TORO",
+    "LOPEZ HERRERA OSCAR ANTONIO",
+    "DOSSMAN MARQUEZ NOHORA LILIANA",
+    "ARIAS FIGUEROA JAIME DIEGO",
+]
+
+# Encabezados con que push publica cada campo del artículo. Una hoja con
+# estos encabezados se lee campo por campo (push seguido de pull deja los
+# mismos artículos); las hojas de inventario originales derivan nombre,
+# categoría y descripción de sus propias columnas. hoja_origen no se publica:
+# siempre es el título de la hoja leída
+ENCABEZADOS_PUBLICADOS = {
+    "placa": "Placa",
+    "nombre": "Nombre",
+    "marca": "Marca",
+    "modelo": "Modelo",
+    "categoria": "Categoría",
+    "descripcion": "Descripción",
+    "valor": "Valor Ingreso",
+    "fecha_adquisicion": "Fecha Adquisición",
+    "ubicacion": "Ubicación",
+    "responsable": "Responsable",
+    "observaciones": "Observaciones",
+    "consecutivo": "Consec.",
+    "tipo_elemento": "Tipo",
+}
+
+COLUMNAS_SALIDA = [
+    "id", "placa", "nombre", "marca", "modelo", "categoria", "descripcion", "valor",
+    "fecha_adquisicion", "ubicacion", "responsable", "observaciones",
+    "consecutivo", "tipo_elemento", "hoja_origen",
+]
+
+
+def normalizar_columnas(cols):
+    """Nombres de columna en minúsculas y con guiones bajos (formato SQLite)"""
+    return [str(c).strip().replace(" ", "_").lower() for c in cols]
+
+
+def tabla_desde_valores(all_values):
+    """DataFrame (object) a partir de get_all_values(), con encabezados en la fila 0.
+
+    Las filas cortas se completan con "" (values:batchGet omite las celdas
+    vacías al final) y si un encabezado se repite gana la última columna,
+    como en un dict.
+    """
+    if len(all_values) <= 1:
+        return pd.DataFrame()
+    df = pd.DataFrame(all_values[1:], dtype=object)
+    headers = [str(h) for h in all_values[0]]
+    headers += [""] * (df.shape[1] - len(headers))
+    df = df.reindex(columns=range(len(headers)))
+    df.columns = headers
+    df = df.loc[:, ~df.columns.duplicated(keep="last")]
+    # Orden de columnas como en un dict construido encabezado por encabezado
+    return df[list(dict.fromkeys(headers))].fillna("")
+
+
+def por_valor(valores, funcion, dtype=object):
+    """Aplicar `funcion` una vez por valor distinto de la columna.
+
+    Los vacíos (NaN/None) son un valor más: sin use_na_sentinel=False su
+    código sería -1 y tomarían el resultado del último valor distinto.
+    """
+    codigos, distintos = pd.factorize(np.asarray(valores, dtype=object), use_na_sentinel=False)
+    resultados = np.empty(len(distintos), dtype=dtype)
+    resultados[:] = [funcion(v) for v in distintos]
+    return resultados[codigos]
+
+
+def _texto(valor):
+    return str(valor).strip()
+
+
+def _columna(df, nombre, defecto=""):
+    if nombre in df.columns:
+        return por_valor(df[nombre], _texto)
+    return np.full(len(df), defecto, dtype=object)
+
+
+def fecha_a_dia(fecha_bruta):
+    """Fecha de adquisición como date ("2023-05-31", "31/05/2023"...); None si no se reconoce"""
+    texto = str(fecha_bruta or "").strip()[:10]
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_texto(texto):
+    """Mayúsculas y sin tildes, para comparar nombres"""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).upper())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def normalizar_ubicacion(ubicacion):
+    """Ubicación comparable: mayúsculas, sin tildes y sin espacios repetidos"""
+    return " ".join(normalizar_texto(ubicacion or "").split())
+
+
+class DirectorioResponsables:
+    """Índice por palabras de los nombres de responsables y sus alias.
+
+    Un nombre coincide cuando todas sus palabras aparecen completas y
+    seguidas en el texto (un apellido suelto no basta). Cada texto se
+    tokeniza una vez y solo se comparan los nombres que empiezan por cada
+    palabra, así el costo no crece con el tamaño del directorio. Los
+    resultados se cachean por texto distinto.
+    """
+
+    def __init__(self, entradas, cache=65536):
+        self.nombres = []
+        self._indice = {}
+        for posicion, entrada in enumerate(entradas):
+            nombre, alias = (entrada, ()) if isinstance(entrada, str) else entrada
+            self.nombres.append(nombre)
+            for variante in (nombre, *alias):
+                palabras = tuple(_PALABRA.findall(normalizar_texto(variante)))
+                if palabras:
+                    self._indice.setdefault(palabras[0], []).append((palabras, posicion))
+        self.ninguno = len(self.nombres)
+        self.buscar = lru_cache(maxsize=cache)(self._buscar)
+
+    def _buscar(self, texto):
+        """Posición del primer nombre del directorio presente en el texto
+        (self.ninguno si no hay ninguno)"""
+        texto = str(texto)
+        if texto.upper() == texto.lower():
+            # Sin letras (placas, códigos, fechas): ningún nombre puede aparecer
+            return self.ninguno
+        palabras = _PALABRA.findall(normalizar_texto(texto))
+        mejor = self.ninguno
+        for inicio, palabra in enumerate(palabras):
+            for frase, posicion in self._indice.get(palabra, ()):
+                if posicion < mejor and tuple(palabras[inicio:inicio + len(frase)]) == frase:
+                    mejor = posicion
+        return mejor
+
+
+@lru_cache(maxsize=4)
+def compilar_directorio(entradas):
+    """Directorio compilado, reutilizado mientras las entradas no cambien.
+
+    `entradas` es una tupla de nombres o de pares (nombre, tupla de alias).
+    """
+    return DirectorioResponsables(entradas)
+
+
+def _resolver_responsable(df, directorio):
+    responsable = np.full(len(df), "Sin asignar", dtype=object)
+    pendiente = np.ones(len(df), dtype=bool)
+    for campo in CAMPOS_RESPONSABLE:
+        if campo not in df.columns:
+            continue
+        texto = por_valor(df[campo], _texto)
+        valido = pendiente & ~por_valor(texto, RESPONSABLES_IGNORADOS.__contains__, dtype=bool)
+        responsable[valido] = texto[valido]
+        pendiente &= ~valido
+
+    if pendiente.any():
+        # Buscar nombres del directorio en cada celda de la fila; gana el
+        # primero según el orden del directorio
+        mejor = np.full(int(pendiente.sum()), directorio.ninguno, dtype=np.int64)
+        for columna in df.columns:
+            posiciones = por_valor(df[columna].to_numpy()[pendiente], directorio.buscar, dtype=np.int64)
+            np.minimum(mejor, posiciones, out=mejor)
+        nombres = np.array(directorio.nombres + ["Sin asignar"], dtype=object)
+        responsable[np.flatnonzero(pendiente)] = nombres[mejor]
+    return responsable
+
+
+def es_hoja_publicada(df):
+    """Si la hoja tiene los encabezados que escribe push (ENCABEZADOS_PUBLICADOS)"""
+    return set(ENCABEZADOS_PUBLICADOS.values()).issubset(df.columns)
+
+def _valores(columna):
+    """Valor Ingreso normalizado a texto decimal ("1234.5")"""
+    return por_valor(centavos_columna(columna), texto_decimal)
+
+def normalizar_dataframe(df, titulo, directorio=None):
+    """Columnas de artículos (dict nombre -> array) a partir de una hoja"""
+    directorio = directorio or compilar_directorio(tuple(NOMBRES_CONOCIDOS))
+    if df.empty:
+        return {columna: np.empty(0, dtype=object) for columna in COLUMNAS_SALIDA}
+
+    # Solo registros con placa válida
+    placa = _columna(df, "Placa")
+    validas = ~por_valor(placa, lambda p: p.lower() in PLACAS_INVALIDAS, dtype=bool)
+    df = df[validas]
+    placa = placa[validas]
+
+    if es_hoja_publicada(df):
+        campos = {campo: _columna(df, encabezado) for campo, encabezado in ENCABEZADOS_PUBLICADOS.items()}
+        campos.update(id=placa, placa=placa, valor=_valores(campos["valor"]),
+                      hoja_origen=np.full(len(df), titulo, dtype=object))
+        return {columna: campos[columna] for columna in COLUMNAS_SALIDA}
+
+    desc_actual = _columna(df, "Descripción Actual")
+    marca = _columna(df, "Marca")
+    modelo = _columna(df, "Modelo")
+
+    # Nombre completo: descripción + marca + modelo cuando aportan algo
+    nombre = desc_actual
+    for parte in (marca, modelo):
+        usar = por_valor(parte, lambda v: bool(v) and v.upper() not in VACIOS_NOMBRE, dtype=bool)
+        nombre = np.where(usar, nombre + " " + parte, nombre)
+    nombre = por_valor(nombre, str.strip)
+    nombre = np.where(nombre == "", desc_actual, nombre)
+    nombre = np.where(nombre == "", "Artículo", nombre).astype(object)
+
+    vacia = lambda v: v.upper() in VACIOS_MARCA_MODELO
+    if "Atributos" in df.columns:
+        descripcion = _columna(df, "Atributos")
+        descripcion = np.where(descripcion == "", desc_actual, descripcion).astype(object)
+    else:
+        descripcion = desc_actual
+
+    return {
+        "id": placa,
+        "placa": placa,
+        "nombre": nombre,
+        "marca": np.where(por_valor(marca, vacia, dtype=bool), "", marca).astype(object),
+        "modelo": np.where(por_valor(modelo, vacia, dtype=bool), "", modelo).astype(object),
+        "categoria": np.where(desc_actual == "", "Sin categoría", desc_actual).astype(object),
+        "descripcion": descripcion,
+        "valor": _valores(_columna(df, "Valor Ingreso", "0")),
+        "fecha_adquisicion": _columna(df, "Fecha Adquisición"),
+        "ubicacion": _columna(df, "Ubicación", "SENA"),
+        "responsable": _resolver_responsable(df, directorio),
+        "observaciones": _columna(df, "Observaciones"),
+        "consecutivo": _columna(df, "Consec."),
+        "tipo_elemento": _columna(df, "Tipo"),
+        "hoja_origen": np.full(len(df), titulo, dtype=object),
+    }
+
+
+def a_registros(columnas):
+    """Lista de dicts por fila a partir de las columnas normalizadas"""
+    nombres = list(columnas)
+    return [dict(zip(nombres, fila)) for fila in zip(*(columnas[n].tolist() for n in nombres))]
+
+
+def procesar_valores(titulo, all_values, directorio=None):
+    """Artículos (lista de dicts) de una hoja leída con get_all_values()"""
+    return a_registros(normalizar_dataframe(tabla_desde_valores(all_values), titulo, directorio))
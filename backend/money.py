@@ -0,0 +1,86 @@
+"""Valores en pesos a centavos enteros.
+
+La hoja usa el formato colombiano: "$" opcional, punto de miles y coma
+decimal ("$18.170.000,00"). En SQLite `valor` se guarda como decimal con
+punto ("18170000.0"); ambos formatos se leen con las mismas reglas.
+
+- a_centavos: un valor suelto, memorizado (los valores se repiten mucho entre
+  filas y entre sincronizaciones).
+- centavos_columna: una columna completa; el formato de la hoja se resuelve
+  con operaciones de pandas y solo lo demás pasa por a_centavos.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+_NO_NUMERICO = re.compile(r"[^0-9.,]")
+_DIGITO = re.compile(r"\d")
+# Formato de la hoja: grupos de miles con punto y hasta dos decimales con coma
+_FORMATO_COLOMBIANO = r"^\s*\$?\s*(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?\s*$"
+
+
+@lru_cache(maxsize=65536)
+def _centavos(texto):
+    limpio = _NO_NUMERICO.sub("", texto)
+    if not _DIGITO.search(limpio):
+        return None
+    if "." in limpio and "," in limpio:
+        # El último separador es el decimal
+        miles = "." if limpio.rfind(",") > limpio.rfind(".") else ","
+        limpio = limpio.replace(miles, "")
+    elif limpio.count(".") > 1 or limpio.count(",") > 1:
+        # Un solo separador repetido: es el de miles
+        limpio = limpio.replace(".", "").replace(",", "")
+    elif "." in limpio and len(limpio) - limpio.rfind(".") == 4:
+        limpio = limpio.replace(".", "")  # "$999.999": punto de miles
+    entero, _, decimales = limpio.replace(",", ".").partition(".")
+    centavos = int(entero or 0) * 100 + int((decimales + "00")[:2])
+    if len(decimales) > 2 and decimales[2] >= "5":
+        centavos += 1
+    return centavos
+
+
+def a_centavos(valor):
+    """Centavos de un valor en pesos; None si está vacío o no tiene dígitos ("", "NA")"""
+    if valor is None:
+        return None
+    return _centavos(str(valor))
+
+
+def centavos_columna(valores):
+    """a_centavos sobre una columna: arreglo float64 con NaN donde no hay valor.
+
+    Cada valor distinto se convierte una sola vez (pd.factorize) y el
+    resultado se reparte a las filas con indexación de NumPy. Los vacíos
+    (None/NaN) son un valor distinto más, no el código -1.
+    """
+    codigos, distintos = pd.factorize(
+        pd.Series(np.asarray(valores, dtype=object)).astype(str), use_na_sentinel=False
+    )
+    serie = pd.Series(distintos, dtype=object)
+    partes = serie.str.extract(_FORMATO_COLOMBIANO)
+    coincide = partes[0].notna().to_numpy()
+    por_distinto = np.full(len(serie), np.nan)
+    if coincide.any():
+        enteros = partes[0][coincide].str.replace(".", "", regex=False).astype(np.int64).to_numpy()
+        decimales = partes[1][coincide].fillna("").str.ljust(2, "0").astype(np.int64).to_numpy()
+        por_distinto[coincide] = enteros * 100 + decimales
+    resto = ~coincide
+    if resto.any():
+        por_distinto[resto] = [np.nan if c is None else c for c in map(a_centavos, serie[resto])]
+    return por_distinto[codigos]
+
+
+def texto_decimal(centavos):
+    """Texto que se guarda en `valor` ("18170000.0"); 0.0 si no hay valor"""
+    if centavos is None or centavos != centavos:  # None o NaN
+        centavos = 0
+    return str(int(centavos) / 100)
+
+
+def formato_colombiano(centavos):
+    """Centavos en el formato de la hoja ("$18.170.000,00")"""
+    pesos, resto = divmod(int(centavos), 100)
+    return f"${pesos:,}".replace(",", ".") + f",{resto:02d}"
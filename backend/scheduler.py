@@ -0,0 +1,162 @@
+"""Sincronización periódica con Google Sheets dentro del ciclo de vida de la app.
+
+Cada cierto intervalo (con variación aleatoria, para que varios procesos no
+consulten a la vez) se pide a Drive la revisión del libro, que es una
+petición liviana. Solo si la revisión cambió se hace la lectura completa y se
+aplican los cambios a SQLite. Ante errores (cuota agotada, red) la siguiente
+consulta se aplaza con backoff exponencial.
+"""
+import asyncio
+import random
+import threading
+from datetime import datetime, timedelta
+
+import gspread
+
+
+def es_error_de_cuota(error):
+    """True si la API de Google rechazó la petición por cuota o límite de tasa"""
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    estado = getattr(error.response, "status_code", None)
+    return estado == 429 or (estado == 403 and "rateLimitExceeded" in str(error))
+
+
+class ProgramadorSync:
+    """Tarea asyncio que sincroniza solo cuando el libro cambió.
+
+    - `consultar_revision()` devuelve la revisión actual del libro (bloqueante).
+    - `sincronizar()` hace la lectura completa y la aplica (bloqueante).
+    - `ejecutar(funcion)` corre una función bloqueante fuera del event loop.
+    - `sin_cambios()` se llama cuando la revisión no cambió (opcional).
+    - `publicar(estado)` recibe el estado tras cada consulta (opcional, p. ej.
+      para que otros procesos lo lean).
+
+    La revisión se consulta antes de sincronizar, así una edición hecha
+    durante la lectura se detecta en la consulta siguiente.
+    """
+
+    def __init__(self, consultar_revision, sincronizar, ejecutar, sin_cambios=None, publicar=None,
+                 intervalo=60.0, variacion=0.2, espera_maxima=900.0):
+        self._consultar_revision = consultar_revision
+        self._sincronizar = sincronizar
+        self._ejecutar = ejecutar
+        self._sin_cambios = sin_cambios
+        self._publicar = publicar
+        self.intervalo = intervalo
+        self.variacion = variacion
+        self.espera_maxima = espera_maxima
+        self._tarea = None
+        self._despertar = None
+        self._forzar = False
+        self._lock = threading.Lock()
+        self.revision = None
+        self.errores_consecutivos = 0
+        self.ultimo_error = None
+        self.ultima_consulta = None
+        self.proxima_consulta = None
+        self.ultima = None  # última sincronización aplicada (de cualquier origen)
+
+    @property
+    def activo(self):
+        return self._tarea is not None and not self._tarea.done()
+
+    def iniciar(self):
+        if self.intervalo > 0 and not self.activo:
+            self._despertar = asyncio.Event()
+            self._tarea = asyncio.get_running_loop().create_task(self._bucle())
+
+    def solicitar(self):
+        """Sincronizar ya, aunque la revisión no haya cambiado (desde el event loop)"""
+        self._forzar = True
+        if self._despertar is not None:
+            self._despertar.set()
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def espera(self):
+        """Segundos hasta la próxima consulta (con variación y backoff)"""
+        base = self.intervalo * (2 ** min(self.errores_consecutivos, 10))
+        base = min(base, max(self.espera_maxima, self.intervalo))
+        return base * random.uniform(1 - self.variacion, 1 + self.variacion)
+
+    async def _bucle(self):
+        # Primera consulta pronto pero escalonada entre procesos
+        espera = random.uniform(0, self.intervalo * self.variacion)
+        while True:
+            self.proxima_consulta = datetime.utcnow() + timedelta(seconds=espera)
+            try:
+                await asyncio.wait_for(self._despertar.wait(), espera)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+            forzar, self._forzar = self._forzar, False
+            await self.revisar(forzar)
+            espera = self.espera()
+            self.proxima_consulta = datetime.utcnow() + timedelta(seconds=espera)
+            await self.publicar()
+
+    async def publicar(self):
+        """Entregar el estado actual a `publicar` (si se configuró)"""
+        if self._publicar is None:
+            return
+        try:
+            await self._ejecutar(self._publicar, self.estado())
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el estado de la sincronización: {e}")
+
+    async def revisar(self, forzar=False):
+        """Consultar la revisión y sincronizar si cambió (o si `forzar`); True si sincronizó"""
+        try:
+            revision = await self._ejecutar(self._consultar_revision)
+            self.ultima_consulta = datetime.utcnow()
+            sincronizo = forzar or revision != self.revision
+            if sincronizo:
+                motivo = "sincronización solicitada" if forzar else f"el libro cambió, revisión {revision}"
+                print(f"🔄 Sincronizando ({motivo})...")
+                await self._ejecutar(self._sincronizar)
+                self.revision = revision
+            elif self._sin_cambios is not None:
+                self._sin_cambios()
+            self.errores_consecutivos = 0
+            self.ultimo_error = None
+            return sincronizo
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errores_consecutivos += 1
+            self.ultimo_error = str(e) or type(e).__name__
+            motivo = "cuota de Google agotada" if es_error_de_cuota(e) else self.ultimo_error
+            print(f"⚠️ Sincronización programada falló ({motivo}); próximo intento en ~{self.espera():.0f}s")
+            return False
+
+    def registrar(self, duracion, cambios):
+        """Anotar una sincronización terminada (programada, manual o por TTL)"""
+        with self._lock:
+            self.ultima = {
+                "fecha": datetime.utcnow().isoformat(),
+                "duracion_segundos": round(duracion, 3),
+                "cambios": cambios,
+                "filas_modificadas": sum(cambios.get(clave, 0) for clave in ("insertados", "actualizados", "eliminados")),
+            }
+
+    def estado(self):
+        with self._lock:
+            ultima = self.ultima
+        return {
+            "activo": self.activo,
+            "intervalo_segundos": self.intervalo,
+            "revision": self.revision,
+            "ultima_consulta": self.ultima_consulta.isoformat() if self.ultima_consulta else None,
+            "proxima_consulta": self.proxima_consulta.isoformat() if self.activo and self.proxima_consulta else None,
+            "errores_consecutivos": self.errores_consecutivos,
+            "ultimo_error": self.ultimo_error,
+            "ultima_sincronizacion": ultima,
+        }
@@ -0,0 +1,68 @@
+"""Serialización JSON de las respuestas del inventario.
+
+Usa orjson cuando está instalado (json de la librería estándar si no) y
+guarda el JSON ya codificado de cada artículo: mientras la huella de la fila
+no cambie, las páginas y exportaciones se arman concatenando esos bytes en
+lugar de volver a construir y codificar un dict por artículo.
+"""
+import json
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # opcional: mismo resultado con la librería estándar
+    orjson = None
+
+
+def dumps(contenido) -> bytes:
+    """JSON compacto en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=str)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse serializada con orjson"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def respuesta_json(status_code=200, **partes):
+    """Objeto JSON con las claves en orden; los valores bytes ya vienen codificados"""
+    cuerpo = b",".join(
+        dumps(clave) + b":" + (valor if isinstance(valor, bytes) else dumps(valor))
+        for clave, valor in partes.items()
+    )
+    return Response(b"{" + cuerpo + b"}", status_code=status_code, media_type="application/json")
+
+
+class FilasCodificadas:
+    """JSON de cada artículo por placa, reutilizado mientras su huella no cambie.
+
+    La huella (sync_gs.huella_articulo) cambia con cualquier campo exportado,
+    así que una sincronización solo invalida las filas que modificó. Hay a lo
+    sumo una entrada por placa.
+    """
+
+    def __init__(self, a_dict):
+        self._a_dict = a_dict
+        self._filas = {}
+
+    def codificar(self, articulo) -> bytes:
+        huella = articulo.huella
+        guardado = self._filas.get(articulo.placa)
+        if guardado is not None and huella and guardado[0] == huella:
+            return guardado[1]
+        datos = dumps(self._a_dict(articulo))
+        if huella:
+            self._filas[articulo.placa] = (huella, datos)
+        return datos
+
+    def lista(self, articulos) -> bytes:
+        """Arreglo JSON con los artículos"""
+        return b"[" + b",".join(self.codificar(a) for a in articulos) + b"]"
+
+    def limpiar(self):
+        self._filas.clear()
@@ -0,0 +1,96 @@
+"""Servir el inventario con varios procesos de uvicorn.
+
+El proceso principal prepara el esquema de SQLite una sola vez y lanza un
+proceso sincronizador (sin HTTP), el único que consulta Google Sheets y
+escribe los artículos, y N workers de uvicorn. La base queda en modo WAL:
+cada consulta ve una versión completa y no espera a la sincronización.
+Los workers detectan el cambio de versión (estado_datos, cada
+ESTADO_REVALIDAR segundos) y sus cachés en memoria pasan a la nueva versión
+juntas. /api/sync/pull en un worker solo deja la solicitud en la base; el
+sincronizador la atiende en unos segundos (SYNC_SOLICITUDES) y, si no da
+señales de vida (latido), responde 503. Si el sincronizador termina con
+error se relanza.
+
+Los workers sí escriben auditorías y el directorio de responsables: son
+filas pequeñas que van por la conexión de escritura de cada proceso (BEGIN
+IMMEDIATE), así que SQLite las serializa con la sincronización.
+
+Uso: python backend/serve.py --workers 4 [--host 0.0.0.0] [--port 8000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+# Espera máxima entre reinicios del sincronizador (1, 2, 4... segundos)
+REINICIO_MAXIMO_SEGUNDOS = float(os.getenv("SYNC_REINICIO_MAXIMO", "60"))
+
+
+def sincronizador():
+    os.environ["INVENTARIO_ROL"] = "sincronizador"
+    sys.path.insert(0, str(BACKEND_DIR))
+    import app
+    try:
+        asyncio.run(app.ejecutar_sincronizador())
+    except KeyboardInterrupt:
+        pass
+
+
+def vigilar_sincronizador(detener):
+    """Mantener el sincronizador en marcha hasta que se pida detener.
+
+    Si termina con error se relanza con una espera creciente; si termina
+    bien (sin credenciales o con SYNC_INTERVALO=0) no hay nada que relanzar.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    espera = 1.0
+    while True:
+        proceso = contexto.Process(target=sincronizador, name="sincronizador")
+        inicio = time.monotonic()
+        proceso.start()
+        while proceso.is_alive() and not detener.wait(1):
+            pass
+        if detener.is_set():
+            proceso.terminate()
+            proceso.join()
+            return
+        if proceso.exitcode == 0:
+            return
+        if time.monotonic() - inicio > REINICIO_MAXIMO_SEGUNDOS:
+            espera = 1.0  # funcionó un buen rato: no es un fallo al arrancar
+        print(f"⚠️ Sincronizador terminó con código {proceso.exitcode}; se relanza en {espera:.0f}s")
+        if detener.wait(espera):
+            return
+        espera = min(espera * 2, REINICIO_MAXIMO_SEGUNDOS)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+
+    # Los procesos hijos heredan el rol: ninguno prepara el esquema al importar database
+    os.environ["INVENTARIO_ROL"] = "lector"
+    import uvicorn
+    import database
+    database.inicializar()  # esquema, estadísticas y FTS5 (y WAL) una sola vez
+
+    detener = threading.Event()
+    vigilante = threading.Thread(target=vigilar_sincronizador, args=(detener,), name="vigilante", daemon=True)
+    vigilante.start()
+    try:
+        uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers, app_dir=str(BACKEND_DIR))
+    finally:
+        detener.set()
+        vigilante.join()
+
+
+if __name__ == "__main__":
+    main()
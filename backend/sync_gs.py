@@ -1,75 +1,381 @@
 import os
-import sqlite3
+import json
+import time
+import random
+import hashlib
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import gspread
-from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1, a1_to_rowcol, absolute_range_name
+from sqlalchemy import select, insert, update
+from database import (
+    SessionLocal, SesionEscritura, engine, Articulo, Responsable, CAMPOS_ARTICULO, registrar_version, columnas_tipadas
+)
+import gs_client
+from ingest import procesar_valores, normalizar_columnas, compilar_directorio, ENCABEZADOS_PUBLICADOS
 
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "inventario.db"
 CREDENTIALS_JSON = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", str(BASE_DIR / "credentials.json"))
 SHEET_ID = os.environ.get("GS_SHEET_ID", None)
 SHEET_NAME = os.environ.get("GS_SHEET_NAME", "Sheet1")
 
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
+# Límites del push por rangos (Sheets API: values.batchUpdate). Cada lote
+# respeta los tres: rangos, celdas y bytes del JSON (la API recomienda
+# cuerpos de 2 MB como máximo)
+RANGOS_POR_LOTE = int(os.environ.get("GS_RANGOS_POR_LOTE", "200"))
+CELDAS_POR_LOTE = int(os.environ.get("GS_CELDAS_POR_LOTE", "50000"))
+BYTES_POR_LOTE = int(os.environ.get("GS_BYTES_POR_LOTE", str(2 * 1024 * 1024)))
+FILAS_POR_RANGO = int(os.environ.get("GS_FILAS_POR_RANGO", "500"))
+MAX_REINTENTOS = int(os.environ.get("GS_MAX_REINTENTOS", "5"))
 
 def get_gspread_client():
-    creds = Credentials.from_service_account_file(CREDENTIALS_JSON, scopes=SCOPES)
-    client = gspread.authorize(creds)
-    return client
+    return gs_client.obtener_cliente(CREDENTIALS_JSON, gs_client.SCOPES_ESCRITURA)
 
-def normalize_cols(cols):
-    return [str(c).strip().replace(" ", "_").lower() for c in cols]
+normalize_cols = normalizar_columnas
 
-def pull_sheet_to_sqlite(sheet_id: str = None, sheet_name: str = None):
+def directorio_responsables():
+    """Directorio compilado con los responsables activos de la tabla `responsables`"""
+    db = SessionLocal()
+    try:
+        filas = db.query(Responsable).filter(Responsable.activo == True).order_by(Responsable.id).all()
+        entradas = tuple((r.nombre, tuple(r.lista_alias())) for r in filas)
+    finally:
+        db.close()
+    return compilar_directorio(entradas)
+
+def valores_hojas(sh, worksheets):
+    """Valores de todas las hojas en una sola llamada values:batchGet.
+    
+    Devuelve un dict título -> matriz como get_all_values(). Si la llamada
+    en bloque falla se leen las hojas una por una; las que fallen quedan
+    fuera del resultado.
+    """
+    if not worksheets:
+        return {}
+    try:
+        respuesta = con_reintentos(sh.values_batch_get, [absolute_range_name(ws.title) for ws in worksheets])
+        rangos = respuesta.get("valueRanges", [])
+        if len(rangos) == len(worksheets):
+            return {ws.title: rango.get("values", []) for ws, rango in zip(worksheets, rangos)}
+        print(f"⚠️ batchGet devolvió {len(rangos)} rangos para {len(worksheets)} hojas; se leen por separado")
+    except Exception as e:
+        print(f"⚠️ Error en la lectura en bloque ({e}); se leen las hojas por separado")
+    
+    valores = {}
+    for worksheet in worksheets:
+        try:
+            valores[worksheet.title] = con_reintentos(worksheet.get_all_values)
+        except Exception as e:
+            print(f"   ❌ Error leyendo hoja {worksheet.title}: {e}")
+    return valores
+
+def leer_libro(sh, sheet_name=None):
+    """Leer las hojas del libro (o solo `sheet_name`).
+    
+    Devuelve los artículos y los títulos de las hojas leídas completas; las
+    hojas que fallan no se incluyen para no dar de baja sus artículos.
+    """
+    directorio = directorio_responsables()
+    if sheet_name:
+        try:
+            worksheets = [sh.worksheet(sheet_name)]
+        except Exception:
+            worksheets = [sh.sheet1]
+    else:
+        worksheets = sh.worksheets()
+    
+    valores = valores_hojas(sh, worksheets)
+    articulos_totales = []
+    hojas_leidas = []
+    for worksheet in worksheets:
+        if worksheet.title not in valores:
+            continue
+        try:
+            print(f"📊 Procesando hoja: {worksheet.title}")
+            articulos = procesar_valores(worksheet.title, valores[worksheet.title], directorio)
+            articulos_totales.extend(articulos)
+            hojas_leidas.append(worksheet.title)
+            print(f"   ✅ {len(articulos)} artículos procesados de {worksheet.title}")
+        except Exception as e:
+            print(f"   ❌ Error procesando hoja {worksheet.title}: {e}")
+            continue
+    
+    return articulos_totales, hojas_leidas
+
+def huella_articulo(fila):
+    """Huella del contenido de un artículo para detectar cambios"""
+    contenido = json.dumps([fila.get(campo, "") for campo in CAMPOS_ARTICULO], ensure_ascii=False)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+def sincronizar_articulos(db, articulos, hojas=None, completo=False, modificadas=None):
+    """Aplicar a `articulos` solo lo que cambió respecto a la última sincronización.
+    
+    Compara la huella de cada artículo (por placa) con la guardada e inserta,
+    actualiza o da de baja (activo=False) lo necesario. Las bajas se limitan a
+    las `hojas` leídas; `completo=True` reescribe todas las filas. Si se pasa
+    un set en `modificadas` se agregan las placas tocadas (para invalidar cachés).
+    """
+    nuevos = {}
+    for art in articulos:
+        fila = {campo: str(art.get(campo, "") or "") for campo in CAMPOS_ARTICULO}
+        fila["huella"] = huella_articulo(fila)
+        nuevos[fila["placa"]] = fila
+    
+    existentes = {
+        fila.placa: fila
+        for fila in db.execute(select(
+            Articulo.id, Articulo.placa, Articulo.huella, Articulo.activo, Articulo.hoja_origen
+        ))
+    }
+    
+    ahora = datetime.utcnow()
+    inserciones, actualizaciones = [], []
+    sin_cambios = 0
+    for placa, fila in nuevos.items():
+        previo = existentes.get(placa)
+        if previo is None:
+            inserciones.append({
+                **fila, **columnas_tipadas(fila), "activo": True, "fecha_creacion": ahora, "fecha_actualizacion": ahora
+            })
+        elif completo or previo.huella != fila["huella"] or not previo.activo:
+            actualizaciones.append({
+                "id": previo.id, **fila, **columnas_tipadas(fila), "activo": True, "fecha_actualizacion": ahora
+            })
+        else:
+            sin_cambios += 1
+    
+    placas_baja = [
+        placa for placa, previo in existentes.items()
+        if previo.activo and placa not in nuevos and (hojas is None or previo.hoja_origen in hojas)
+    ]
+    bajas = [{"id": existentes[placa].id, "activo": False, "fecha_actualizacion": ahora} for placa in placas_baja]
+    
+    if inserciones:
+        db.execute(insert(Articulo), inserciones)
+    if actualizaciones:
+        db.execute(update(Articulo), actualizaciones)
+    if bajas:
+        db.execute(update(Articulo), bajas)
+    if inserciones or actualizaciones or bajas:
+        # Misma transacción: la versión nunca queda desfasada de los datos
+        registrar_version(db)
+    db.commit()
+    if modificadas is not None:
+        modificadas.update(fila["placa"] for fila in inserciones + actualizaciones)
+        modificadas.update(placas_baja)
+    
+    return {
+        "insertados": len(inserciones),
+        "actualizados": len(actualizaciones),
+        "eliminados": len(bajas),
+        "sin_cambios": sin_cambios,
+    }
+
+def pull_sheet_to_sqlite(sheet_id: str = None, sheet_name: str = None, completo: bool = False):
     sheet_id = sheet_id or SHEET_ID
     sheet_name = sheet_name or SHEET_NAME
     if not sheet_id:
         raise ValueError("SHEET_ID no configurado. Define GS_SHEET_ID env var.")
     client = get_gspread_client()
     sh = client.open_by_key(sheet_id)
+    articulos, hojas = leer_libro(sh, sheet_name)
+    if not articulos:
+        raise ValueError("No se encontraron artículos en la hoja; no se sincroniza.")
+
+    db = SesionEscritura()
     try:
-        ws = sh.worksheet(sheet_name)
-    except Exception:
-        ws = sh.sheet1
-
-    records = ws.get_all_records()
-    df = pd.DataFrame.from_records(records) if records else pd.DataFrame()
-    if not df.empty:
-        df.columns = normalize_cols(df.columns)
-    if "last_updated" not in df.columns:
-        df["last_updated"] = datetime.utcnow().isoformat(timespec='seconds')
-
-    conn = sqlite3.connect(DB_PATH)
-    df.to_sql("articulos", conn, if_exists="replace", index=False)
-    conn.close()
-    return {"ok": True, "rows": len(df)}
-
-def push_sqlite_to_sheet(sheet_id: str = None, sheet_name: str = None):
+        resumen = sincronizar_articulos(db, articulos, hojas=hojas, completo=completo)
+    finally:
+        db.close()
+    return {"ok": True, "rows": len(articulos), **resumen}
+
+def con_reintentos(funcion, *args, **kwargs):
+    """Llamar a la API reintentando con backoff exponencial ante cuota (429) o errores 5xx"""
+    for intento in range(MAX_REINTENTOS + 1):
+        try:
+            return funcion(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            estado = getattr(e.response, "status_code", None)
+            if estado not in (429, 500, 502, 503, 504) or intento == MAX_REINTENTOS:
+                raise
+            espera = min(64, 2 ** intento) + random.uniform(0, 1)
+            print(f"⏳ Sheets API respondió {estado}, reintento en {espera:.1f}s")
+            time.sleep(espera)
+
+def rango_a1(fila, col_inicio, col_fin, filas=1):
+    return f"{rowcol_to_a1(fila, col_inicio)}:{rowcol_to_a1(fila + filas - 1, col_fin)}"
+
+# Bytes de {"range": ..., "values": ...} y la coma que lo separa del siguiente
+SOBRECARGA_RANGO = 64
+
+def tamano_json(valor):
+    """Bytes aproximados de `valor` en el cuerpo JSON de la petición"""
+    return len(json.dumps(valor, ensure_ascii=False).encode("utf-8"))
+
+def rangos_bloque(fila_inicio, filas):
+    """Rangos para escribir `filas` consecutivas desde `fila_inicio`.
+    
+    Cada rango cabe solo en un lote: a lo sumo FILAS_POR_RANGO filas,
+    CELDAS_POR_LOTE celdas y BYTES_POR_LOTE bytes.
+    """
+    rangos = []
+    inicio = ancho = 0
+    tamano = SOBRECARGA_RANGO
+    for posicion, fila in enumerate(filas):
+        filas_bloque = posicion - inicio
+        ancho_nuevo = max(ancho, len(fila))
+        tamano_fila = tamano_json(fila) + 1
+        if filas_bloque and (
+            filas_bloque >= FILAS_POR_RANGO
+            or (filas_bloque + 1) * ancho_nuevo > CELDAS_POR_LOTE
+            or tamano + tamano_fila > BYTES_POR_LOTE
+        ):
+            rangos.append({"range": rango_a1(fila_inicio + inicio, 1, ancho, filas_bloque), "values": filas[inicio:posicion]})
+            inicio, ancho_nuevo, tamano = posicion, len(fila), SOBRECARGA_RANGO
+        ancho = ancho_nuevo
+        tamano += tamano_fila
+    if inicio < len(filas):
+        rangos.append({"range": rango_a1(fila_inicio + inicio, 1, ancho, len(filas) - inicio), "values": filas[inicio:]})
+    return rangos
+
+def lotes_rangos(rangos):
+    """Agrupar los rangos en lotes de batch_update dentro de RANGOS_POR_LOTE,
+    CELDAS_POR_LOTE y BYTES_POR_LOTE (un rango más grande va solo)"""
+    lote, celdas, tamano = [], 0, 0
+    for rango in rangos:
+        celdas_rango = sum(len(fila) for fila in rango["values"])
+        tamano_rango = tamano_json(rango) + 1
+        if lote and (
+            len(lote) >= RANGOS_POR_LOTE
+            or celdas + celdas_rango > CELDAS_POR_LOTE
+            or tamano + tamano_rango > BYTES_POR_LOTE
+        ):
+            yield lote
+            lote, celdas, tamano = [], 0, 0
+        lote.append(rango)
+        celdas += celdas_rango
+        tamano += tamano_rango
+    if lote:
+        yield lote
+
+def calcular_cambios(actual, headers, filas, clave="placa"):
+    """Rangos mínimos para que la hoja (`actual`) refleje `headers` + `filas`.
+    
+    Las filas se emparejan por `clave`: en las existentes solo se reescribe
+    el tramo de columnas que cambió y las nuevas se agregan al final.
+    Devuelve None si los encabezados no coinciden (hace falta escritura completa).
+    """
+    if not actual:
+        return None
+    encabezado_actual = list(actual[0])
+    while encabezado_actual and encabezado_actual[-1] == "":
+        encabezado_actual.pop()
+    if encabezado_actual != headers:
+        return None
+    
+    indice = headers.index(clave)
+    posiciones = {}
+    for numero, fila in enumerate(actual[1:], start=2):
+        if len(fila) > indice and fila[indice]:
+            posiciones[fila[indice]] = numero
+    
+    rangos, nuevas = [], []
+    actualizadas = celdas = 0
+    for fila in filas:
+        numero = posiciones.get(fila[indice])
+        if numero is None:
+            nuevas.append(fila)
+            continue
+        previa = list(actual[numero - 1]) + [""] * (len(headers) - len(actual[numero - 1]))
+        cambiadas = [j for j in range(len(headers)) if previa[j] != fila[j]]
+        if cambiadas:
+            inicio, fin = cambiadas[0], cambiadas[-1]
+            rangos.append({"range": rango_a1(numero, inicio + 1, fin + 1), "values": [fila[inicio:fin + 1]]})
+            actualizadas += 1
+            celdas += fin - inicio + 1
+    
+    if nuevas:
+        rangos.extend(rangos_bloque(len(actual) + 1, nuevas))
+        celdas += len(nuevas) * len(headers)
+    
+    return rangos, {"filas_actualizadas": actualizadas, "filas_nuevas": len(nuevas), "celdas": celdas}
+
+def enviar_rangos(worksheet, rangos):
+    """Enviar los rangos en lotes de batch_update, ampliando la hoja si hace falta"""
+    if not rangos:
+        return 0
+    ultima_fila = ultima_col = 0
+    for rango in rangos:
+        fin = rango["range"].split(":")[-1]
+        fila, col = a1_to_rowcol(fin)
+        ultima_fila, ultima_col = max(ultima_fila, fila), max(ultima_col, col)
+    if ultima_fila > worksheet.row_count:
+        con_reintentos(worksheet.add_rows, ultima_fila - worksheet.row_count)
+    if ultima_col > worksheet.col_count:
+        con_reintentos(worksheet.add_cols, ultima_col - worksheet.col_count)
+    
+    lotes = 0
+    for lote in lotes_rangos(rangos):
+        con_reintentos(worksheet.batch_update, lote)
+        lotes += 1
+    return lotes
+
+def rangos_sobrantes(actual, alto, ancho):
+    """Rangos A1 del contenido anterior (`actual`) fuera de las `alto` x `ancho` celdas escritas"""
+    alto_previo = len(actual)
+    ancho_previo = max((len(fila) for fila in actual), default=0)
+    rangos = []
+    if ancho_previo > ancho:
+        rangos.append(rango_a1(1, ancho + 1, ancho_previo, alto_previo))
+    if alto_previo > alto:
+        rangos.append(rango_a1(alto + 1, 1, min(ancho, ancho_previo), alto_previo - alto))
+    return rangos
+
+def push_sqlite_to_sheet(sheet_id: str = None, sheet_name: str = None, completo: bool = False):
+    """Publicar `articulos` en la hoja enviando solo las celdas que cambiaron.
+    
+    Solo se publican los campos del artículo de los artículos activos, con
+    los encabezados de ingest.ENCABEZADOS_PUBLICADOS: pull relee la hoja
+    con el mismo mapeo. Con `completo=True` (o si los encabezados de la hoja
+    no coinciden) se reescribe todo por bloques, sin vaciar la hoja antes, y
+    se limpia lo que sobre del contenido anterior (filas y columnas).
+    """
     sheet_id = sheet_id or SHEET_ID
     sheet_name = sheet_name or SHEET_NAME
     if not sheet_id:
         raise ValueError("SHEET_ID no configurado. Define GS_SHEET_ID env var.")
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM articulos", conn)
-    conn.close()
+    # Columnas internas (id, huella, fechas) y derivadas (valor_centavos...) no van a la hoja
+    with engine.connect() as conn:
+        df = pd.read_sql_query(
+            select(*(getattr(Articulo, campo) for campo in ENCABEZADOS_PUBLICADOS))
+            .where(Articulo.activo == True)
+            .order_by(Articulo.id),
+            conn,
+        )
 
     client = get_gspread_client()
     sh = client.open_by_key(sheet_id)
     try:
         worksheet = sh.worksheet(sheet_name)
-        worksheet.clear()
-    except Exception:
+        actual = con_reintentos(worksheet.get_all_values)
+    except gspread.exceptions.WorksheetNotFound:
         worksheet = sh.add_worksheet(title=sheet_name, rows="1000", cols="20")
+        actual = []
+
+    headers = [ENCABEZADOS_PUBLICADOS[campo] for campo in df.columns]
+    filas = df.fillna("").astype(str).values.tolist()
+    cambios = None if completo else calcular_cambios(actual, headers, filas, clave=ENCABEZADOS_PUBLICADOS["placa"])
+    if cambios is not None:
+        rangos, resumen = cambios
+        lotes = enviar_rangos(worksheet, rangos)
+        return {"ok": True, "rows": len(df), "modo": "delta", "lotes": lotes, **resumen}
 
-    headers = list(df.columns)
-    values = [headers] + df.fillna("").astype(str).values.tolist()
-    worksheet.update(values)
-    return {"ok": True, "rows": len(df)}
+    lotes = enviar_rangos(worksheet, rangos_bloque(1, [headers] + filas))
+    sobrantes = rangos_sobrantes(actual, len(filas) + 1, len(headers))
+    if sobrantes:
+        con_reintentos(worksheet.batch_clear, sobrantes)
+    return {"ok": True, "rows": len(df), "modo": "completo", "lotes": lotes}
 
 if __name__ == "__main__":
     import argparse
@@ -77,8 +383,9 @@ if __name__ == "__main__":
     parser.add_argument("action", choices=["pull","push"])
     parser.add_argument("--sheet-id", default=None)
     parser.add_argument("--sheet-name", default=None)
+    parser.add_argument("--completo", action="store_true", help="reescribir todas las filas (pull o push)")
     args = parser.parse_args()
     if args.action == "pull":
-        print(pull_sheet_to_sqlite(sheet_id=args.sheet_id, sheet_name=args.sheet_name))
+        print(pull_sheet_to_sqlite(sheet_id=args.sheet_id, sheet_name=args.sheet_name, completo=args.completo))
     else:
-        print(push_sqlite_to_sheet(sheet_id=args.sheet_id, sheet_name=args.sheet_name))
+        print(push_sqlite_to_sheet(sheet_id=args.sheet_id, sheet_name=args.sheet_name, completo=args.completo))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la normalización de hojas: bucle fila por fila vs. ingest columnar.
+
+Usa prototipo_inventario/articulos_importados.csv replicado N veces (placas
+únicas) y verifica que ambas implementaciones producen los mismos artículos.
+El responsable y el valor se comparan aparte: ingest busca nombres completos
+del directorio, no fragmentos sueltos como hacía el bucle anterior, y lee el
+formato colombiano de los valores ("$18.170.000,00") que el bucle convertía mal.
+
+Uso: python benchmark_ingest.py [--factor 100] [--repeticiones 3] [--directorio 500]
+"""
+
+import re
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE / "backend"))
+from ingest import procesar_valores, compilar_directorio, NOMBRES_CONOCIDOS
+
+CSV = BASE / "prototipo_inventario" / "articulos_importados.csv"
+
+
+def procesar_hoja_por_filas(titulo, all_values):
+    """Implementación anterior (fila por fila) de sync_gs.procesar_hoja, como referencia"""
+    articulos = []
+    if len(all_values) <= 1:
+        return articulos
+    
+    headers = all_values[0]
+    data_rows = all_values[1:]
+    
+    for i, row in enumerate(data_rows):
+        try:
+            # Asegurar que la fila tenga suficientes columnas
+            while len(row) < len(headers):
+                row.append("")
+            
+            # Crear diccionario para la fila
+            row_dict = {headers[j]: row[j] if j < len(row) else "" for j in range(len(headers))}
+            
+            # Extraer placa
+            placa = str(row_dict.get("Placa", "")).strip()
+            
+            # Solo incluir registros con placa válida
+            if not placa or placa.lower() in ['', 'nan', 'none', 'null', 'placa']:
+                continue
+            
+            # Extraer datos principales
+            desc_actual = str(row_dict.get("Descripción Actual", "")).strip()
+            marca = str(row_dict.get("Marca", "")).strip()
+            modelo = str(row_dict.get("Modelo", "")).strip()
+            
+            # Construir nombre completo
+            nombre_completo = desc_actual
+            if marca and marca.upper() not in ['NA', 'N/A', '.', 'NAN']:
+                nombre_completo += f" {marca}"
+            if modelo and modelo.upper() not in ['NA', 'N/A', '.', 'NAN']:
+                nombre_completo += f" {modelo}"
+            
+            # Valor monetario
+            valor_bruto = str(row_dict.get("Valor Ingreso", "0"))
+            valor_limpio = re.sub(r'[^0-9.,]', '', valor_bruto.replace(',', ''))
+            try:
+                valor_numerico = float(valor_limpio) if valor_limpio else 0
+            except:
+                valor_numerico = 0
+            
+            # Determinar responsable
+            responsable = "Sin asignar"
+            
+            # Buscar en varios campos posibles
+            campos_responsable = ["Centro/R", "Responsable", "Custodio", "Usuario"]
+            for campo in campos_responsable:
+                if campo in row_dict and row_dict[campo].strip():
+                    texto_resp = str(row_dict[campo]).strip()
+                    if texto_resp not in ['76,922710', '76.922710', '', 'NA']:
+                        responsable = texto_resp
+                        break
+            
+            # Si no encontró, buscar nombres conocidos
+            if responsable == "Sin asignar":
+                nombres_conocidos = [
+                    "ALVAREZ DIAZ JUAN GONZALO",
+                    "MANTILLA ARENAS WILLIAM", 
+                    "ALEXANDER ZAPATA TORO",
+                    "LOPEZ HERRERA OSCAR ANTONIO",
+                    "DOSSMAN MARQUEZ NOHORA LILIANA",
+                    "ARIAS FIGUEROA JAIME DIEGO"
+                ]
+                
+                fila_texto = " ".join(str(v) for v in row_dict.values()).upper()
+                for nombre in nombres_conocidos:
+                    if any(parte in fila_texto for parte in nombre.split()):
+                        responsable = nombre
+                        break
+            
+            # Crear artículo
+            articulo = {
+                "id": placa,
+                "placa": placa,
+                "nombre": nombre_completo.strip() or desc_actual or "Artículo",
+                "marca": marca if marca.upper() not in ['NA', 'N/A', 'NAN'] else "",
+                "modelo": modelo if modelo.upper() not in ['NA', 'N/A', 'NAN'] else "",
+                "categoria": desc_actual or "Sin categoría",
+                "descripcion": str(row_dict.get("Atributos", desc_actual)).strip() or desc_actual,
+                "valor": str(valor_numerico),
+                "fecha_adquisicion": str(row_dict.get("Fecha Adquisición", "")).strip(),
+                "ubicacion": str(row_dict.get("Ubicación", "SENA")).strip(),
+                "responsable": responsable,
+                "observaciones": str(row_dict.get("Observaciones", "")).strip(),
+                "consecutivo": str(row_dict.get("Consec.", "")).strip(),
+                "tipo_elemento": str(row_dict.get("Tipo", "")).strip(),
+                "hoja_origen": titulo
+            }
+            
+            articulos.append(articulo)
+            
+        except Exception as e:
+            print(f"   ⚠️ Error fila {i+1}: {e}")
+            continue
+    
+    return articulos
+
+
+
+def cargar_valores(factor):
+    """Matriz tipo get_all_values() con los encabezados originales de la hoja"""
+    with open(CSV, encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    headers = [h.replace("_", " ").title() for h in filas[0]]
+    indice_placa = headers.index("Placa")
+    datos = []
+    for copia in range(factor):
+        for fila in filas[1:]:
+            fila = list(fila)
+            if copia:
+                fila[indice_placa] = f"{fila[indice_placa]}-{copia}"
+            datos.append(fila)
+    return [headers] + datos
+
+
+def sin_campos(articulos, campos=("responsable", "valor")):
+    return [{k: v for k, v in a.items() if k not in campos} for a in articulos]
+
+
+def directorio_sintetico(tamano):
+    """Directorio con los nombres conocidos más custodios ficticios"""
+    extra = tuple(f"CUSTODIO{i} APELLIDO{i} NOMBRE{i}" for i in range(max(tamano - len(NOMBRES_CONOCIDOS), 0)))
+    return compilar_directorio(tuple(NOMBRES_CONOCIDOS) + extra)
+
+
+def medir(funcion, valores, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        copia = [list(f) for f in valores]
+        inicio = time.perf_counter()
+        resultado = funcion("Inventario", copia)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factor", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--directorio", type=int, default=500, help="tamaño del directorio de responsables")
+    args = parser.parse_args()
+
+    base = cargar_valores(1)
+    anterior = procesar_hoja_por_filas("Inventario", [list(f) for f in base])
+    nuevo = procesar_valores("Inventario", base)
+    assert sin_campos(anterior) == sin_campos(nuevo), "Las implementaciones no coinciden"
+    distintos = sum(a["responsable"] != b["responsable"] for a, b in zip(anterior, nuevo))
+    corregidos = sum(a["valor"] != b["valor"] for a, b in zip(anterior, nuevo))
+    print(f"✅ Resultados idénticos en el CSV original ({distintos} responsables por coincidencia parcial "
+          f"ya no se asignan, {corregidos} valores corregidos)")
+
+    valores = cargar_valores(args.factor)
+    print(f"📊 {len(valores) - 1} filas (CSV x{args.factor}), mejor de {args.repeticiones}")
+    t_filas, r_filas = medir(procesar_hoja_por_filas, valores, args.repeticiones)
+    t_columnas, r_columnas = medir(procesar_valores, valores, args.repeticiones)
+    assert len(r_filas) == len(r_columnas)
+    print(f"   Fila por fila: {t_filas:8.3f} s")
+    print(f"   Columnar:      {t_columnas:8.3f} s")
+    print(f"   Aceleración:   {t_filas / t_columnas:8.1f}x")
+
+    directorio = directorio_sintetico(args.directorio)
+    t_directorio, _ = medir(lambda titulo, v: procesar_valores(titulo, v, directorio), valores, args.repeticiones)
+    print(f"   Columnar con {len(directorio.nombres)} responsables: {t_directorio:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser de valores en pesos (backend/money.py).
+
+Compara, sobre los valores de prototipo_inventario/articulos_importados.csv
+repetidos --factor veces, la limpieza anterior (regex por fila, que además
+convertía mal "$18.170.000,00"), a_centavos sin y con memoria y
+centavos_columna. Solo mide tiempos: la corrección (cruce con Decimal, ida y
+vuelta por los formatos de salida, vacíos) la comprueban tests/test_money.py.
+
+Uso: python benchmark_valores.py [--factor 100] [--repeticiones 3]
+"""
+
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE / "backend"))
+from money import a_centavos, centavos_columna, formato_colombiano, _centavos
+
+CSV = BASE / "prototipo_inventario" / "articulos_importados.csv"
+
+
+def valor_anterior(valor_bruto):
+    """Limpieza anterior (fila por fila) de "Valor Ingreso", como referencia"""
+    import re
+    valor_limpio = re.sub(r"[^0-9.,]", "", str(valor_bruto).replace(",", ""))
+    try:
+        return str(float(valor_limpio) if valor_limpio else 0)
+    except ValueError:
+        return "0"
+
+
+def cargar_valores(factor):
+    with open(CSV, encoding="utf-8") as archivo:
+        filas = list(csv.reader(archivo))
+    indice = [c.strip().lower() for c in filas[0]].index("valor_ingreso")
+    return [fila[indice] for fila in filas[1:]] * factor
+
+
+def medir(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        _centavos.cache_clear()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factor", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    base = cargar_valores(1)
+    total = sum(a_centavos(v) or 0 for v in base)
+    anterior = sum(round(float(valor_anterior(v)) * 100) for v in base)
+    print(f"   Total del inventario: {formato_colombiano(total)} (la limpieza anterior daba {formato_colombiano(anterior)})")
+
+    valores = cargar_valores(args.factor)
+    print(f"📊 {len(valores)} valores ({len(set(valores))} distintos), mejor de {args.repeticiones}")
+    sin_memoria = _centavos.__wrapped__
+    tiempos = {
+        "Anterior (regex por fila)": medir(lambda: [valor_anterior(v) for v in valores], args.repeticiones),
+        "a_centavos sin memoria": medir(lambda: [sin_memoria(v) for v in valores], args.repeticiones),
+        "a_centavos con memoria": medir(lambda: [a_centavos(v) for v in valores], args.repeticiones),
+        "centavos_columna": medir(lambda: centavos_columna(valores), args.repeticiones),
+    }
+    referencia = tiempos["Anterior (regex por fila)"]
+    for nombre, segundos in tiempos.items():
+        print(f"   {nombre:<27} {segundos:8.3f} s  ({referencia / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
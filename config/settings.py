@@ -8,11 +8,18 @@ DATA_DIR = BASE_DIR / "data"
 
 # Base de datos
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BACKEND_DIR}/inventario.db")
+# SQLite: conexiones de lectura en el pool y ajustes de cada conexión
+SQLITE_LECTORES = int(os.getenv("SQLITE_LECTORES", 8))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", 256))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64))
+SQLITE_ESPERA_MS = int(os.getenv("SQLITE_ESPERA_MS", 5000))
 
 # Servidor
 HOST = os.getenv("HOST", "127.0.0.1")
 PORT = int(os.getenv("PORT", 8000))
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+# Rol del proceso con serve.py: "completo", "sincronizador" o "lector"
+INVENTARIO_ROL = os.getenv("INVENTARIO_ROL", "completo")
 
 # Google Sheets
 GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", str(BACKEND_DIR / "credentials.json"))
@@ -3,6 +3,7 @@
 # Pre-requisitos: tener el archivo Excel "Copia de Inventario_2025(1).xlsx" en la misma carpeta.
 
 import os
+import sys
 import sqlite3
 import hashlib
 import shutil
@@ -10,6 +11,9 @@ import json
 from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from ingest import normalizar_columnas
+
 BASE = Path.cwd()
 EXCEL = BASE / "Copia de Inventario_2025(1).xlsx"
 OUT = BASE / "prototipo_inventario"
@@ -33,7 +37,7 @@ main_sheet = candidates[0] if candidates else list(xls.keys())[0]
 df_art = xls[main_sheet].copy()
 
 # Normalizar nombres de columnas
-df_art.columns = [str(c).strip().replace(" ", "_").lower() for c in df_art.columns]
+df_art.columns = normalizar_columnas(df_art.columns)
 
 # Crear DB SQLite
 if DB.exists():
@@ -55,7 +59,7 @@ location_sheet_candidates = [name for name in xls.keys() if "ubic" in name.lower
 if location_sheet_candidates:
     loc_sheet = location_sheet_candidates[0]
     df_loc = xls[loc_sheet].copy()
-    df_loc.columns = [str(c).strip().replace(" ", "_").lower() for c in df_loc.columns]
+    df_loc.columns = normalizar_columnas(df_loc.columns)
     cur.execute("""CREATE TABLE IF NOT EXISTS ubicaciones (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         nombre TEXT,
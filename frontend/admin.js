@@ -0,0 +1,397 @@
+// Variables globales
+let datosActuales = [];
+let paginaActual = 1;
+let totalPaginas = 1;
+let cursores = {};  // página -> cursor `after` para pedirla a la API
+let consultaCursores = '';  // filtros y artículos por página a los que pertenecen los cursores
+
+// Inicialización
+document.addEventListener('DOMContentLoaded', function() {
+    cargarEstadisticas();
+    cargarCategorias();
+    cargarResponsables();
+    
+    // Event listeners
+    document.getElementById('busqueda-texto').addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            buscarTexto();
+        }
+    });
+});
+
+// Cargar estadísticas principales
+async function cargarEstadisticas() {
+    try {
+        const response = await fetch('/api/inventario/estadisticas');
+        const data = await response.json();
+        
+        if (data.resumen) {
+            document.getElementById('total-articulos').textContent = data.resumen.total_articulos.toLocaleString();
+            document.getElementById('valor-total').textContent = '$' + Math.round(data.resumen.valor_total_inventario).toLocaleString();
+            document.getElementById('total-categorias').textContent = data.resumen.total_categorias;
+            document.getElementById('total-responsables').textContent = data.resumen.total_responsables;
+        }
+    } catch (error) {
+        console.error('Error cargando estadísticas:', error);
+    }
+}
+
+// Cargar categorías para filtro
+async function cargarCategorias() {
+    try {
+        const response = await fetch('/api/inventario/categorias');
+        const data = await response.json();
+        const select = document.getElementById('filtro-categoria');
+        
+        data.categorias.forEach(categoria => {
+            const option = document.createElement('option');
+            option.value = categoria;
+            option.textContent = categoria;
+            select.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error cargando categorías:', error);
+    }
+}
+
+// Cargar responsables para filtro
+async function cargarResponsables() {
+    try {
+        const response = await fetch('/api/inventario/responsables');
+        const data = await response.json();
+        const select = document.getElementById('filtro-responsable');
+        
+        data.responsables.forEach(responsable => {
+            const option = document.createElement('option');
+            option.value = responsable;
+            option.textContent = responsable;
+            select.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error cargando responsables:', error);
+    }
+}
+
+// Agregar el cursor de la página si ya se conoce. Un cursor solo vale para
+// la consulta que lo generó: la página 1 o un cambio de filtros o de
+// artículos por página reinician el recorrido (sin cursor la API usa `page`)
+function agregarCursor(params, pagina) {
+    const consulta = new URLSearchParams(params);
+    consulta.delete('page');
+    const clave = consulta.toString();
+    if (pagina === 1 || clave !== consultaCursores) {
+        cursores = {1: ''};
+        consultaCursores = clave;
+    }
+    if (pagina in cursores) params.append('after', cursores[pagina]);
+    return clave;
+}
+
+function guardarCursor(data, pagina, clave) {
+    // Una respuesta tardía de otra consulta no deja su cursor
+    if (data.next && clave === consultaCursores) cursores[pagina + 1] = data.next;
+}
+
+// Cargar inventario completo
+async function cargarInventario(pagina = 1) {
+    mostrarLoading(true);
+    
+    try {
+        const params = new URLSearchParams();
+        params.append('page', pagina);
+        params.append('limit', document.getElementById('items-por-pagina').value);
+        const consulta = agregarCursor(params, pagina);
+        const response = await fetch(`/api/inventario/consulta?${params.toString()}`);
+        const data = await response.json();
+        
+        guardarCursor(data, pagina, consulta);
+        mostrarResultados(data);
+        paginaActual = data.page;
+        totalPaginas = data.total_pages;
+        
+    } catch (error) {
+        console.error('Error cargando inventario:', error);
+        alert('Error cargando el inventario');
+    } finally {
+        mostrarLoading(false);
+    }
+}
+
+// Buscar por texto
+async function buscarTexto() {
+    const texto = document.getElementById('busqueda-texto').value.trim();
+    if (!texto) {
+        alert('Ingrese un texto para buscar');
+        return;
+    }
+    
+    mostrarLoading(true);
+    
+    try {
+        const response = await fetch(`/api/inventario/buscar?q=${encodeURIComponent(texto)}&limit=100`);
+        const data = await response.json();
+        
+        const dataFormateada = {
+            articulos: data.resultados || [],
+            total: data.total_encontrados || 0,
+            page: 1,
+            total_pages: 1,
+            has_next: false,
+            has_prev: false
+        };
+        
+        mostrarResultados(dataFormateada);
+        
+    } catch (error) {
+        console.error('Error en búsqueda:', error);
+        alert('Error realizando la búsqueda');
+    } finally {
+        mostrarLoading(false);
+    }
+}
+
+// Aplicar filtros
+async function aplicarFiltros(pagina = 1) {
+    mostrarLoading(true);
+    
+    try {
+        const params = new URLSearchParams();
+        params.append('page', pagina);
+        params.append('limit', document.getElementById('items-por-pagina').value);
+        
+        const categoria = document.getElementById('filtro-categoria').value;
+        const responsable = document.getElementById('filtro-responsable').value;
+        const marca = document.getElementById('filtro-marca').value;
+        const fechaDesde = document.getElementById('fecha-desde').value;
+        const fechaHasta = document.getElementById('fecha-hasta').value;
+        const valorMin = document.getElementById('valor-min').value;
+        const valorMax = document.getElementById('valor-max').value;
+        
+        if (categoria) params.append('categoria', categoria);
+        if (responsable) params.append('responsable', responsable);
+        if (marca) params.append('marca', marca);
+        if (fechaDesde) params.append('desde', fechaDesde);
+        if (fechaHasta) params.append('hasta', fechaHasta);
+        if (valorMin) params.append('valor_min', valorMin);
+        if (valorMax) params.append('valor_max', valorMax);
+        const consulta = agregarCursor(params, pagina);
+        
+        const response = await fetch(`/api/inventario/consulta?${params.toString()}`);
+        const data = await response.json();
+        
+        guardarCursor(data, pagina, consulta);
+        mostrarResultados(data);
+        paginaActual = data.page;
+        totalPaginas = data.total_pages;
+        
+    } catch (error) {
+        console.error('Error aplicando filtros:', error);
+        alert('Error aplicando los filtros');
+    } finally {
+        mostrarLoading(false);
+    }
+}
+
+// Mostrar resultados
+function mostrarResultados(data) {
+    datosActuales = data.articulos || [];
+    
+    document.getElementById('total-resultados').textContent = `${data.total || 0} artículos`;
+    
+    const tbody = document.getElementById('tabla-resultados');
+    tbody.innerHTML = '';
+    
+    if (datosActuales.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="7" class="text-center">No se encontraron artículos</td></tr>';
+        document.getElementById('resultados-container').style.display = 'block';
+        return;
+    }
+    
+    datosActuales.forEach(articulo => {
+        const fila = document.createElement('tr');
+        fila.innerHTML = `
+            <td><span class="badge bg-secondary">${articulo.placa}</span></td>
+            <td><strong>${articulo.nombre}</strong></td>
+            <td>${articulo.marca}</td>
+            <td><span class="badge bg-info badge-custom">${articulo.categoria}</span></td>
+            <td class="price">$${parseFloat(articulo.valor || 0).toLocaleString()}</td>
+            <td><small>${articulo.responsable}</small></td>
+            <td>
+                <button class="btn btn-sm btn-outline-primary" onclick="verDetalle('${articulo.placa}')">
+                    <i class="bi bi-eye"></i> Ver
+                </button>
+            </td>
+        `;
+        tbody.appendChild(fila);
+    });
+    
+    // Actualizar información de página
+    const inicio = ((data.page || 1) - 1) * parseInt(document.getElementById('items-por-pagina').value) + 1;
+    const fin = Math.min(inicio + datosActuales.length - 1, data.total || 0);
+    document.getElementById('info-pagina').textContent = `Mostrando ${inicio} - ${fin} de ${data.total || 0} artículos`;
+    
+    // Crear paginación
+    crearPaginacion(data);
+    
+    document.getElementById('resultados-container').style.display = 'block';
+}
+
+// Crear controles de paginación
+function crearPaginacion(data) {
+    const paginacionHTML = `
+        <ul class="pagination pagination-sm">
+            <li class="page-item ${!data.has_prev ? 'disabled' : ''}">
+                <a class="page-link" href="#" onclick="cambiarPagina(${(data.page || 1) - 1})">Anterior</a>
+            </li>
+            <li class="page-item active">
+                <span class="page-link">${data.page || 1} de ${data.total_pages || 1}</span>
+            </li>
+            <li class="page-item ${!data.has_next ? 'disabled' : ''}">
+                <a class="page-link" href="#" onclick="cambiarPagina(${(data.page || 1) + 1})">Siguiente</a>
+            </li>
+        </ul>
+    `;
+    
+    document.getElementById('paginacion-superior').innerHTML = paginacionHTML;
+    document.getElementById('paginacion-inferior').innerHTML = paginacionHTML;
+}
+
+// Cambiar página
+function cambiarPagina(nuevaPagina) {
+    if (nuevaPagina < 1 || nuevaPagina > totalPaginas) return;
+    
+    // Verificar si hay filtros activos
+    const hayFiltros = document.getElementById('filtro-categoria').value ||
+                      document.getElementById('filtro-responsable').value ||
+                      document.getElementById('filtro-marca').value ||
+                      document.getElementById('fecha-desde').value ||
+                      document.getElementById('fecha-hasta').value ||
+                      document.getElementById('valor-min').value ||
+                      document.getElementById('valor-max').value;
+    
+    if (hayFiltros) {
+        aplicarFiltros(nuevaPagina);
+    } else {
+        cargarInventario(nuevaPagina);
+    }
+}
+
+// Ver detalle de artículo
+async function verDetalle(placa) {
+    try {
+        const response = await fetch(`/api/inventario/${placa}/detalle`);
+        const data = await response.json();
+        
+        if (data.encontrado && data.articulo) {
+            const articulo = data.articulo;
+            const contenido = `
+                <div class="row">
+                    <div class="col-md-6">
+                        <h6>Información General</h6>
+                        <table class="table table-sm">
+                            <tr><td><strong>Placa:</strong></td><td>${articulo.placa}</td></tr>
+                            <tr><td><strong>Nombre:</strong></td><td>${articulo.nombre}</td></tr>
+                            <tr><td><strong>Marca:</strong></td><td>${articulo.marca}</td></tr>
+                            <tr><td><strong>Modelo:</strong></td><td>${articulo.modelo}</td></tr>
+                            <tr><td><strong>Categoría:</strong></td><td>${articulo.categoria}</td></tr>
+                        </table>
+                    </div>
+                    <div class="col-md-6">
+                        <h6>Información Administrativa</h6>
+                        <table class="table table-sm">
+                            <tr><td><strong>Valor:</strong></td><td class="price">$${parseFloat(articulo.valor || 0).toLocaleString()}</td></tr>
+                            <tr><td><strong>Fecha Adq.:</strong></td><td>${articulo.fecha_adquisicion}</td></tr>
+                            <tr><td><strong>Ubicación:</strong></td><td>${articulo.ubicacion}</td></tr>
+                            <tr><td><strong>Responsable:</strong></td><td>${articulo.responsable}</td></tr>
+                        </table>
+                    </div>
+                </div>
+                
+                <div class="row mt-3">
+                    <div class="col-12">
+                        <h6>Descripción Técnica</h6>
+                        <p class="bg-light p-3 rounded">${articulo.descripcion}</p>
+                    </div>
+                </div>
+                
+                ${articulo.observaciones ? `
+                <div class="row mt-3">
+                    <div class="col-12">
+                        <h6>Observaciones</h6>
+                        <p class="text-muted">${articulo.observaciones}</p>
+                    </div>
+                </div>
+                ` : ''}
+            `;
+            
+            document.getElementById('contenido-detalle').innerHTML = contenido;
+            new bootstrap.Modal(document.getElementById('modalDetalle')).show();
+        } else {
+            alert('No se pudo cargar el detalle del artículo');
+        }
+    } catch (error) {
+        console.error('Error cargando detalle:', error);
+        alert('Error cargando el detalle');
+    }
+}
+
+// Limpiar filtros
+function limpiarFiltros() {
+    document.getElementById('busqueda-texto').value = '';
+    document.getElementById('filtro-categoria').value = '';
+    document.getElementById('filtro-responsable').value = '';
+    document.getElementById('filtro-marca').value = '';
+    document.getElementById('fecha-desde').value = '';
+    document.getElementById('fecha-hasta').value = '';
+    document.getElementById('valor-min').value = '';
+    document.getElementById('valor-max').value = '';
+    document.getElementById('items-por-pagina').value = '50';
+    
+    // Ocultar resultados
+    document.getElementById('resultados-container').style.display = 'none';
+}
+
+// Exportar resultados (simulado)
+function exportarResultados() {
+    if (datosActuales.length === 0) {
+        alert('No hay datos para exportar');
+        return;
+    }
+    
+    // Crear CSV simple
+    let csv = 'Placa,Nombre,Marca,Modelo,Categoria,Valor,Fecha,Ubicacion,Responsable\n';
+    
+    datosActuales.forEach(articulo => {
+        csv += `"${articulo.placa}","${articulo.nombre}","${articulo.marca}","${articulo.modelo}","${articulo.categoria}","${articulo.valor}","${articulo.fecha_adquisicion}","${articulo.ubicacion}","${articulo.responsable}"\n`;
+    });
+    
+    // Descargar
+    const blob = new Blob([csv], { type: 'text/csv' });
+    const url = window.URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `inventario_${new Date().toISOString().split('T')[0]}.csv`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+    window.URL.revokeObjectURL(url);
+}
+
+// Mostrar/ocultar loading
+function mostrarLoading(mostrar) {
+    document.getElementById('loading').style.display = mostrar ? 'block' : 'none';
+}
+
+// Funciones adicionales de compatibilidad (para mantener funcionalidad anterior)
+async function syncData() {
+    try {
+        const response = await fetch('/api/sync/pull', { method: 'POST' });
+        const data = await response.json();
+        alert('✅ ' + data.message);
+        
+        // Recargar estadísticas después de sincronizar
+        cargarEstadisticas();
+    } catch (error) {
+        alert('❌ Error en sincronización: ' + error.message);
+    }
+}
@@ -29,19 +29,13 @@ def test_connection():
     try:
         # Importar dependencias
         print("📦 Importando dependencias...")
-        import gspread
-        from google.oauth2.service_account import Credentials
+        sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+        import gs_client
         print("✅ Dependencias importadas")
         
-        # Configurar credenciales
+        # Configurar credenciales (mismo cliente compartido que usa el backend)
         print("🔐 Configurando credenciales...")
-        SCOPES = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        client = gspread.authorize(creds)
+        client = gs_client.precargar(CREDENTIALS_FILE, gs_client.SCOPES_ESCRITURA)
         print("✅ Cliente autorizado")
         
         # Conectar a la hoja específica
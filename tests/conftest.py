@@ -0,0 +1,11 @@
+"""Configuración común de las pruebas: módulos de backend/ y una base SQLite temporal."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Nunca tocar backend/inventario.db: database.py crea el esquema al importarse
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='inventario_')) / 'inventario.db'}"
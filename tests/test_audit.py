@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import delete, select
+
+import audit
+from database import Articulo, Auditoria, EscaneoAuditoria, EsperadoAuditoria, SessionLocal, columnas_tipadas
+
+
+def _articulo(placa, ubicacion):
+    fila = {"placa": placa, "nombre": "Silla", "valor": "0.0", "ubicacion": ubicacion}
+    return Articulo(**fila, **columnas_tipadas(fila))
+
+
+@pytest.fixture
+def inventario():
+    with SessionLocal() as db:
+        for modelo in (EscaneoAuditoria, EsperadoAuditoria, Auditoria, Articulo):
+            db.execute(delete(modelo))
+        db.add_all([
+            _articulo("A1", "Bodega Central"),
+            _articulo("A2", "BODEGA  CENTRAL"),
+            _articulo("A3", "Bodéga central "),
+            _articulo("B1", "Oficina 2"),
+        ])
+        db.commit()
+    yield
+
+
+def test_filtro_ubicacion_ignora_tildes_mayusculas_y_espacios(inventario):
+    with SessionLocal() as db:
+        auditoria = audit.crear_auditoria(db, "Bodega", " bodega central")
+        esperadas = set(db.scalars(
+            select(EsperadoAuditoria.placa).where(EsperadoAuditoria.auditoria_id == auditoria.id)
+        ))
+        assert auditoria.esperados == 3
+        assert esperadas == {"A1", "A2", "A3"}
+
+
+def test_escaneo_en_otra_ubicacion(inventario):
+    with SessionLocal() as db:
+        auditoria = audit.crear_auditoria(db, "Bodega", "Bodega Central")
+        cambios = audit.registrar_escaneos(db, auditoria, ["A1", "B1", "Z9"])
+        assert cambios["ubicacion_incorrecta"] == ["B1"]
+        assert cambios["inesperados"] == ["Z9"]
+        assert cambios["resumen"]["encontrados"] == 1
+
+
+def test_lotes_intercalados_no_pierden_contadores(inventario):
+    with SessionLocal() as db:
+        auditoria_id = audit.crear_auditoria(db, "Bodega", "Bodega Central").id
+
+    # Las dos sesiones cargan la auditoría con los contadores en cero antes de escribir
+    with SessionLocal() as uno, SessionLocal() as otro:
+        auditoria_uno = uno.get(Auditoria, auditoria_id)
+        auditoria_otro = otro.get(Auditoria, auditoria_id)
+        assert auditoria_uno.escaneados == auditoria_otro.escaneados == 0
+        audit.registrar_escaneos(uno, auditoria_uno, ["A1"])
+        resumen = audit.registrar_escaneos(otro, auditoria_otro, ["A2"])["resumen"]
+
+    assert resumen["escaneados"] == 2
+    assert resumen["encontrados"] == 2
+    assert resumen["faltantes"] == 1
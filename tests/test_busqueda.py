@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import delete, select
+
+from app import filtros_consulta
+from database import Articulo, SessionLocal, columnas_tipadas
+
+
+@pytest.fixture
+def inventario():
+    with SessionLocal() as db:
+        db.execute(delete(Articulo))
+        for placa, nombre in (
+            ("92271016217", "ANTENA WIRELESS DFI302"),
+            ("92271014722", "Portátil AMD Ryzen 7"),
+            ("92271099999", "Silla ergonómica"),
+        ):
+            fila = {"placa": placa, "nombre": nombre, "descripcion": "Elemento devolutivo", "valor": "0.0"}
+            db.add(Articulo(**fila, **columnas_tipadas(fila)))
+        db.commit()
+    yield
+
+
+def _buscar(texto):
+    with SessionLocal() as db:
+        return set(db.scalars(select(Articulo.placa).where(*filtros_consulta(busqueda=texto))))
+
+
+@pytest.mark.parametrize("texto, placas", [
+    ("16217", {"92271016217"}),        # subcadena de la placa
+    ("FI302", {"92271016217"}),        # subcadena del modelo en el nombre
+    ("ryzen", {"92271014722"}),        # palabra, sin distinguir mayúsculas
+    ("portatil amd", {"92271014722"}),  # palabras por prefijo, sin tildes
+    ("922710", {"92271016217", "92271014722", "92271099999"}),
+    ("devolutivo", {"92271016217", "92271014722", "92271099999"}),
+    ("xyz", set()),
+])
+def test_busqueda_por_subcadena_y_palabras(inventario, texto, placas):
+    assert _buscar(texto) == placas
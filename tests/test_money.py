@@ -0,0 +1,100 @@
+"""Valores en pesos: conversión a centavos, ida y vuelta por los formatos de
+salida y vacíos (que nunca toman el valor de otra fila)."""
+import csv
+import math
+import random
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from money import a_centavos, centavos_columna, texto_decimal, formato_colombiano
+from ingest import por_valor, procesar_valores
+
+CSV = Path(__file__).resolve().parent.parent / "prototipo_inventario" / "articulos_importados.csv"
+
+
+def valores_csv():
+    """Valores distintos de valor_ingreso del inventario de ejemplo"""
+    with open(CSV, encoding="utf-8") as archivo:
+        filas = list(csv.reader(archivo))
+    indice = [c.strip().lower() for c in filas[0]].index("valor_ingreso")
+    return sorted({fila[indice] for fila in filas[1:]})
+
+
+def centavos_decimal(valor):
+    """Conversión independiente del formato de la hoja ("$18.170.000,00"), con Decimal"""
+    return int(Decimal(valor.replace("$", "").replace(".", "").replace(",", ".")) * 100)
+
+
+def muestras_aleatorias(cantidad=5000, semilla=2024):
+    azar = random.Random(semilla)
+    return [azar.randrange(0, 10 ** azar.randint(1, 13)) for _ in range(cantidad)]
+
+VACIOS = ["", "  ", "NA", "N/A", "$", "sin valor", None, float("nan")]
+
+
+@pytest.mark.parametrize("valor", VACIOS)
+def test_a_centavos_vacios(valor):
+    assert a_centavos(valor) is None
+
+
+@pytest.mark.parametrize("valor, centavos", [
+    ("$18.170.000,00", 1_817_000_000),
+    ("$1.234,5", 123_450),
+    ("18170000.0", 1_817_000_000),
+    ("999", 99_900),
+])
+def test_a_centavos_formatos(valor, centavos):
+    assert a_centavos(valor) == centavos
+
+
+def test_centavos_columna_vacios_son_nan():
+    resultado = centavos_columna(VACIOS + ["$5.000,00"])
+    assert np.isnan(resultado[:-1]).all()
+    assert resultado[-1] == 500_000
+
+
+def test_texto_decimal_sin_valor():
+    assert texto_decimal(None) == "0.0"
+    assert texto_decimal(float("nan")) == "0.0"
+
+
+def test_por_valor_aplica_la_funcion_a_los_vacios():
+    valores = [float("nan"), 1.0, None, 2.0]
+    resultado = por_valor(valores, lambda v: "vacío" if v is None or (isinstance(v, float) and math.isnan(v)) else v)
+    assert resultado.tolist() == ["vacío", 1.0, "vacío", 2.0]
+
+
+def test_valor_ingreso_en_blanco_no_toma_el_de_otra_fila():
+    hoja = [["Placa", "Descripción Actual", "Valor Ingreso"]]
+    valores = ["", "$5.000,00", "NA", "abc", "$1.234,5", "  ", "$5.000,00"]
+    hoja += [[f"P{i}", "SILLA", valor] for i, valor in enumerate(valores)]
+    articulos = procesar_valores("Hoja1", hoja)
+    assert [a["valor"] for a in articulos] == ["0.0", "5000.0", "0.0", "0.0", "1234.5", "0.0", "5000.0"]
+
+
+@pytest.mark.parametrize("valor", valores_csv())
+def test_valores_del_csv_coinciden_con_decimal(valor):
+    centavos = centavos_decimal(valor)
+    assert a_centavos(valor) == centavos
+    # Ida y vuelta por los formatos de salida
+    texto = formato_colombiano(centavos)
+    for variante in (texto, texto[1:], f" {texto} ", texto_decimal(centavos)):
+        assert a_centavos(variante) == centavos
+
+
+def test_centavos_columna_coincide_con_decimal_en_el_csv():
+    valores = valores_csv()
+    assert centavos_columna(valores).astype(np.int64).tolist() == [centavos_decimal(v) for v in valores]
+
+
+def test_ida_y_vuelta_de_valores_aleatorios():
+    muestras = muestras_aleatorias()
+    for centavos in muestras:
+        texto = formato_colombiano(centavos)
+        for variante in (texto, texto[1:], f" {texto} ", texto_decimal(centavos)):
+            assert a_centavos(variante) == centavos, variante
+    columna = [formato_colombiano(c) for c in muestras] + [texto_decimal(c) for c in muestras]
+    assert centavos_columna(columna).astype(np.int64).tolist() == muestras * 2
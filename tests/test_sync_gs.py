@@ -0,0 +1,224 @@
+import pytest
+from gspread.utils import a1_to_rowcol
+from sqlalchemy import delete, select
+
+import sync_gs
+from database import Articulo, SessionLocal, SesionEscritura, columnas_tipadas, leer_version
+from ingest import ENCABEZADOS_PUBLICADOS
+
+
+class HojaFalsa:
+    """Worksheet mínima: guarda la cuadrícula y cada llamada a batch_update"""
+
+    title = "Hoja"
+
+    def __init__(self, valores):
+        self.valores = [list(fila) for fila in valores]
+        self.row_count = max(1000, len(valores))
+        self.col_count = max(len(fila) for fila in valores)
+        self.lotes = []
+
+    def add_rows(self, filas):
+        self.row_count += filas
+
+    def add_cols(self, columnas):
+        self.col_count += columnas
+
+    def get_all_values(self):
+        """Como la API: sin filas vacías al final y rectangular hasta la última celda con datos"""
+        filas = [list(fila) for fila in self.valores]
+        while filas and not any(filas[-1]):
+            filas.pop()
+        ancho = max((max((j + 1 for j, v in enumerate(f) if v), default=0) for f in filas), default=0)
+        return [(f + [""] * ancho)[:ancho] for f in filas]
+
+    def batch_clear(self, rangos):
+        for rango in rangos:
+            inicio, fin = rango.split(":")
+            (fila, columna), (ultima_fila, ultima_columna) = a1_to_rowcol(inicio), a1_to_rowcol(fin)
+            for numero in range(fila, min(ultima_fila, len(self.valores)) + 1):
+                actual = self.valores[numero - 1]
+                for j in range(columna - 1, min(ultima_columna, len(actual))):
+                    actual[j] = ""
+
+    def batch_update(self, rangos):
+        self.lotes.append(rangos)
+        for rango in rangos:
+            inicio, fin = rango["range"].split(":")
+            fila, columna = a1_to_rowcol(inicio)
+            assert a1_to_rowcol(fin)[0] == fila + len(rango["values"]) - 1
+            assert fila + len(rango["values"]) - 1 <= self.row_count
+            for numero, valores in enumerate(rango["values"], start=fila):
+                while len(self.valores) < numero:
+                    self.valores.append([])
+                actual = self.valores[numero - 1]
+                actual.extend([""] * (columna - 1 + len(valores) - len(actual)))
+                actual[columna - 1:columna - 1 + len(valores)] = valores
+
+
+ENCABEZADOS = ["placa", "nombre", "marca", "modelo", "categoria", "valor", "ubicacion", "responsable"]
+
+
+def _fila(numero, nombre="Silla"):
+    return [f"P{numero:06d}", nombre, "ACME", "X1", "Muebles", "150000.0", "Bodega", "Sin asignar"]
+
+
+def _revisar_lotes(hoja):
+    for lote in hoja.lotes:
+        assert len(lote) <= sync_gs.RANGOS_POR_LOTE
+        assert sum(len(fila) for rango in lote for fila in rango["values"]) <= sync_gs.CELDAS_POR_LOTE
+        assert sync_gs.tamano_json(lote) <= sync_gs.BYTES_POR_LOTE
+
+
+def test_cambios_grandes_respetan_limites_por_lote():
+    existentes = [_fila(n) for n in range(1000)]
+    hoja = HojaFalsa([ENCABEZADOS] + existentes)
+    filas = [_fila(n, "Mesa") if n % 2 else _fila(n) for n in range(1000)]
+    filas += [_fila(n) for n in range(1000, 101000)]
+
+    rangos, resumen = sync_gs.calcular_cambios(hoja.valores, ENCABEZADOS, filas)
+    lotes = sync_gs.enviar_rangos(hoja, rangos)
+
+    assert resumen == {"filas_actualizadas": 500, "filas_nuevas": 100000, "celdas": 500 + 100000 * len(ENCABEZADOS)}
+    assert lotes == len(hoja.lotes) > 1
+    _revisar_lotes(hoja)
+    assert hoja.valores == [ENCABEZADOS] + filas
+
+
+def test_celdas_largas_se_cortan_por_bytes(monkeypatch):
+    monkeypatch.setattr(sync_gs, "BYTES_POR_LOTE", 64 * 1024)
+    hoja = HojaFalsa([ENCABEZADOS])
+    filas = [[f"P{n}", "ñ" * 2000] + [""] * 6 for n in range(300)]
+
+    rangos, _ = sync_gs.calcular_cambios(hoja.valores, ENCABEZADOS, filas)
+    sync_gs.enviar_rangos(hoja, rangos)
+
+    assert len(hoja.lotes) > 1
+    _revisar_lotes(hoja)
+    assert hoja.valores == [ENCABEZADOS] + filas
+
+
+class LibroFalso:
+    def __init__(self, hoja):
+        self.hoja = hoja
+
+    def worksheet(self, titulo):
+        return self.hoja
+
+    def values_batch_get(self, rangos, params=None):
+        return {"valueRanges": [{"range": rango, "values": self.hoja.get_all_values()} for rango in rangos]}
+
+
+class ClienteFalso:
+    def __init__(self, hoja):
+        self.libro = LibroFalso(hoja)
+
+    def open_by_key(self, sheet_id):
+        return self.libro
+
+
+@pytest.fixture
+def articulos_guardados():
+    with SessionLocal() as db:
+        db.execute(delete(Articulo))
+        for numero, activo in ((1, True), (2, True), (3, False)):
+            fila = {
+                "placa": f"P{numero}", "nombre": f"Silla {numero} ACME X1", "marca": "ACME", "categoria": "Silla",
+                "descripcion": "", "valor": "150000.5", "fecha_adquisicion": "2023-05-31",
+                "ubicacion": "Bodega", "responsable": "Sin asignar", "consecutivo": str(numero),
+                "modelo": "X1", "observaciones": "", "tipo_elemento": "Devolutivo",
+            }
+            db.add(Articulo(**fila, **columnas_tipadas(fila), huella="x", activo=activo))
+        db.commit()
+    yield
+
+
+def test_reescritura_completa_limpia_filas_y_columnas_anteriores(articulos_guardados, monkeypatch):
+    # Hoja con un formato anterior más ancho y más largo que lo que se publica
+    anterior = [[f"viejo{i}-{j}" for j in range(20)] for i in range(11)]
+    hoja = HojaFalsa(anterior)
+    monkeypatch.setattr(sync_gs, "get_gspread_client", lambda: ClienteFalso(hoja))
+
+    resultado = sync_gs.push_sqlite_to_sheet(sheet_id="libro", sheet_name="Hoja")
+
+    assert resultado["modo"] == "completo"
+    assert resultado["rows"] == 2  # el artículo inactivo no se publica
+    valores = hoja.get_all_values()
+    encabezados = valores[0]
+    assert len(valores) == 3
+    assert encabezados == list(ENCABEZADOS_PUBLICADOS.values())
+    assert not any(v.startswith("viejo") for fila in valores for v in fila)
+    assert [fila[encabezados.index("Placa")] for fila in valores[1:]] == ["P1", "P2"]
+
+    # Con los encabezados ya alineados, el siguiente push es incremental
+    assert sync_gs.push_sqlite_to_sheet(sheet_id="libro", sheet_name="Hoja")["modo"] == "delta"
+
+
+def _campos(placa):
+    with SessionLocal() as db:
+        articulo = db.scalar(select(Articulo).where(Articulo.placa == placa))
+        return {campo: getattr(articulo, campo) for campo in ENCABEZADOS_PUBLICADOS}, articulo.activo
+
+
+def test_push_y_pull_devuelven_los_mismos_articulos(articulos_guardados, monkeypatch):
+    hoja = HojaFalsa([[""]])
+    monkeypatch.setattr(sync_gs, "get_gspread_client", lambda: ClienteFalso(hoja))
+    antes = _campos("P1")
+
+    sync_gs.push_sqlite_to_sheet(sheet_id="libro", sheet_name="Hoja")
+    resultado = sync_gs.pull_sheet_to_sqlite(sheet_id="libro", sheet_name="Hoja")
+
+    assert resultado["rows"] == 2
+    assert resultado["insertados"] == resultado["eliminados"] == 0
+    assert _campos("P1") == antes
+    assert _campos("P3")[1] is False  # sigue de baja
+    # Ya con hoja_origen = "Hoja", otra vuelta no cambia nada
+    sync_gs.push_sqlite_to_sheet(sheet_id="libro", sheet_name="Hoja")
+    assert sync_gs.pull_sheet_to_sqlite(sheet_id="libro", sheet_name="Hoja")["sin_cambios"] == 2
+
+
+def _articulo(placa, hoja, nombre="Silla", valor="1000.0"):
+    return {"placa": placa, "nombre": nombre, "valor": valor, "hoja_origen": hoja}
+
+
+def _sincronizar(articulos, **opciones):
+    with SesionEscritura() as db:
+        return sync_gs.sincronizar_articulos(db, articulos, **opciones)
+
+
+def _activos():
+    with SessionLocal() as db:
+        return dict(db.execute(select(Articulo.placa, Articulo.valor_centavos).where(Articulo.activo == True)).all())
+
+
+@pytest.fixture
+def sin_articulos():
+    with SessionLocal() as db:
+        db.execute(delete(Articulo))
+        db.commit()
+    yield
+
+
+def test_sincronizar_inserta_actualiza_y_da_de_baja_solo_en_las_hojas_leidas(sin_articulos):
+    inicial = [_articulo("A", "H1"), _articulo("B", "H1"), _articulo("D", "H1"), _articulo("C", "H2")]
+    assert _sincronizar(inicial) == {"insertados": 4, "actualizados": 0, "eliminados": 0, "sin_cambios": 0}
+    with SessionLocal() as db:
+        version = leer_version(db)[0]
+
+    # Solo se leyó H1: D desaparece de ella y se da de baja; C (H2) no se toca
+    modificadas = set()
+    cambios = _sincronizar([_articulo("A", "H1", valor="2500.5"), _articulo("B", "H1")], hojas=["H1"], modificadas=modificadas)
+    assert cambios == {"insertados": 0, "actualizados": 1, "eliminados": 1, "sin_cambios": 1}
+    assert modificadas == {"A", "D"}
+    assert _activos() == {"A": 250050, "B": 100000, "C": 100000}
+    with SessionLocal() as db:
+        assert leer_version(db)[0] != version
+
+    # Sin cambios no se escribe nada; una placa que vuelve se reactiva
+    assert _sincronizar([_articulo("A", "H1", valor="2500.5"), _articulo("B", "H1")], hojas=["H1"])["sin_cambios"] == 2
+    assert _sincronizar([_articulo("D", "H1")], hojas=["H9"])["actualizados"] == 1
+    assert set(_activos()) == {"A", "B", "C", "D"}
+
+    # Sin `hojas` la lectura se considera completa: lo que falta se da de baja
+    assert _sincronizar([_articulo("A", "H1", valor="2500.5")])["eliminados"] == 3
+    assert set(_activos()) == {"A"}